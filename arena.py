@@ -0,0 +1,159 @@
+import argparse
+
+import numpy as np
+
+from bullet_pool import OWNER_PLAYER
+from features import featurizer_for, observation_dim
+from layouts import spawn_cells
+from pathfinding import NO_ACTION, get_pathfinder
+from sim_core import ACTION_DELTAS, INPUT_SHOOT, Simulation
+
+
+ACTION_DX = np.array([d[0] for d in ACTION_DELTAS], dtype=np.int64)
+ACTION_DY = np.array([d[1] for d in ACTION_DELTAS], dtype=np.int64)
+
+
+def chase_actions(ex, ey, px, py):
+    diff_x = px - ex
+    diff_y = py - ey
+    horizontal = np.abs(diff_x) > np.abs(diff_y)
+    return np.where(horizontal, np.where(diff_x > 0, 3, 2), np.where(diff_y > 0, 1, 0))
+
+
+def path_chase_actions(sim):
+    pf = get_pathfinder(sim.walls, sim.width, sim.height)
+    hops = pf.next_hop[pf.cell(sim.enemy_x, sim.enemy_y), pf.cell(sim.player.grid_x, sim.player.grid_y)]
+    fallback = chase_actions(sim.enemy_x, sim.enemy_y, sim.player.grid_x, sim.player.grid_y)
+    return np.where(hops == NO_ACTION, fallback, hops).astype(np.int64)
+
+
+class ArenaSimulation(Simulation):
+    num_enemies = 8
+    min_spawn_distance = 8
+
+    def __init__(self, enemy_controller=None, recorder=None, num_enemies=None, width=None, height=None):
+        if num_enemies is not None:
+            self.num_enemies = num_enemies
+        super().__init__(enemy_controller=enemy_controller, recorder=recorder, width=width, height=height)
+
+    def reset(self):
+        super().reset()
+        self.padded_blocked = self.walls.padded()
+        cells = spawn_cells(
+            self.walls,
+            (self.player.grid_x, self.player.grid_y),
+            self.num_enemies,
+            self.min_spawn_distance,
+            width=self.width,
+            height=self.height,
+        )
+        self.enemy_x = np.array([x for x, _ in cells], dtype=np.int64)
+        self.enemy_y = np.array([y for _, y in cells], dtype=np.int64)
+        self.enemy_hp = np.full(self.num_enemies, self.enemy.max_hp, dtype=np.int64)
+        self.enemy_hurt = np.zeros(self.num_enemies, dtype=np.int64)
+        self.enemy_alive = np.ones(self.num_enemies, dtype=bool)
+
+    def observations(self, out=None, view_radius=None):
+        featurizer = self.featurizer
+        if view_radius is not None:
+            featurizer = featurizer_for(self.walls, self.width, self.height, view_radius)
+        if out is None:
+            out = np.empty((self.num_enemies, featurizer.state_dim), dtype=np.float32)
+        return featurizer.write_batch(out, self.enemy_x, self.enemy_y, self.player.grid_x, self.player.grid_y)
+
+    def move_enemies(self, actions):
+        new_x = self.enemy_x + ACTION_DX[actions]
+        new_y = self.enemy_y + ACTION_DY[actions]
+        free = self.enemy_alive & ~self.padded_blocked[new_x + 1, new_y + 1]
+        self.enemy_x = np.where(free, new_x, self.enemy_x)
+        self.enemy_y = np.where(free, new_y, self.enemy_y)
+
+    def update(self, inputs=0):
+        if inputs & INPUT_SHOOT:
+            self.spawn_player_bullet()
+        self.player.handle_input(inputs)
+        if self.player.hurt_timer > 0:
+            self.player.hurt_timer -= 1
+        np.maximum(self.enemy_hurt - 1, 0, out=self.enemy_hurt)
+        self.enemy_step_counter += 1
+        if self.enemy_step_counter >= 2:
+            self.enemy_step_counter = 0
+            with self.profiler.phase("controller"):
+                if self.enemy_controller is not None:
+                    actions = np.asarray(self.enemy_controller(self), dtype=np.int64)
+                else:
+                    actions = chase_actions(self.enemy_x, self.enemy_y, self.player.grid_x, self.player.grid_y)
+            self.move_enemies(actions)
+        self.bullets.update(self.width, self.height)
+        with self.profiler.phase("collisions"):
+            self.handle_collisions()
+        self.tick += 1
+
+    def handle_collisions(self):
+        alive = np.flatnonzero(self.enemy_alive)
+        self.entity_grid[self.enemy_x[alive], self.enemy_y[alive]] = alive
+        hits = self.bullets.collide(self.blocked, self.entity_grid, OWNER_PLAYER)
+        self.entity_grid[self.enemy_x[alive], self.enemy_y[alive]] = -1
+        if len(hits):
+            hits = np.unique(hits)
+            hits = hits[self.enemy_hurt[hits] == 0]
+            self.enemy_hp[hits] -= 1
+            self.enemy_hurt[hits] = 12
+            self.enemy_alive &= self.enemy_hp > 0
+            if not self.enemy_alive.any():
+                self.game_over = True
+                self.win_text = "Player Wins"
+        contact = self.enemy_alive & (self.enemy_x == self.player.grid_x) & (self.enemy_y == self.player.grid_y)
+        if contact.any() and self.player.hurt_timer == 0 and not self.game_over:
+            self.player.hp -= 1
+            self.player.hurt_timer = 12
+            if self.player.hp <= 0:
+                self.game_over = True
+                self.win_text = "Enemy Wins"
+
+    def snapshot(self):
+        snapshot = super().snapshot()
+        snapshot["enemies"] = [
+            array.copy() for array in (self.enemy_x, self.enemy_y, self.enemy_hp, self.enemy_hurt, self.enemy_alive)
+        ]
+        return snapshot
+
+    def restore(self, snapshot):
+        super().restore(snapshot)
+        self.enemy_x, self.enemy_y, self.enemy_hp, self.enemy_hurt, self.enemy_alive = (
+            array.copy() for array in snapshot["enemies"]
+        )
+
+
+def make_arena_controller(model_path="enemy_dqn.pth", num_enemies=ArenaSimulation.num_enemies, rule_mix=0.5):
+    import torch
+
+    from dqn_agent import load_enemy_dqn, model_view_radius
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_enemy_dqn(model_path, device)
+    view_radius = model_view_radius(model)
+    state_tensor = torch.zeros(num_enemies, observation_dim(view_radius), dtype=torch.float32)
+    state_buffer = state_tensor.numpy()
+
+    def controller(sim):
+        sim.observations(state_buffer, view_radius)
+        with torch.no_grad():
+            dqn_actions = model(state_tensor.to(device)).argmax(1).cpu().numpy()
+        rule_actions = path_chase_actions(sim)
+        return np.where(np.random.random(num_enemies) < rule_mix, rule_actions, dqn_actions)
+
+    return controller
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", default="enemy_dqn.pth")
+    parser.add_argument("--enemies", type=int, default=8)
+    args = parser.parse_args()
+
+    from game_core import ArenaGame
+
+    controller = make_arena_controller(args.model_path, args.enemies)
+    game = ArenaGame(enemy_controller=controller, num_enemies=args.enemies)
+    game.run()
@@ -0,0 +1,50 @@
+import copy
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+class DecisionView:
+    def __init__(self, sim):
+        self.tick = sim.tick
+        self.width = sim.width
+        self.height = sim.height
+        self.walls = sim.walls
+        self.featurizer = sim.featurizer
+        self.player = copy.copy(sim.player)
+        self.enemy = copy.copy(sim.enemy)
+
+
+class AsyncEnemyController:
+    def __init__(self, controller, budget=0.005, fallback=None):
+        self.controller = controller
+        self.budget = budget
+        self.fallback = fallback
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="enemy-controller")
+        self.future = None
+        self.last_action = None
+        self.decisions = 0
+        self.late = 0
+
+    def __call__(self, sim):
+        self.decisions += 1
+        if self.future is not None and self.future.done():
+            self.last_action = self.future.result()
+            self.future = None
+        if self.future is None:
+            self.future = self.executor.submit(self.controller, DecisionView(sim))
+            try:
+                action = self.future.result(timeout=self.budget)
+            except TimeoutError:
+                pass
+            else:
+                self.future = None
+                self.last_action = action
+                return action
+        self.late += 1
+        if self.fallback is not None:
+            return self.fallback(sim)
+        if self.last_action is not None:
+            return self.last_action
+        return sim.enemy.chase_player_action(sim.player)
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,217 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import numpy as np
+import torch
+import torch.optim as optim
+
+from dqn_agent import EnemyDQN, optimize_model, train_dqn
+from replay_memory import ReplayMemory
+from rl_env import RLEnvironment
+from sim_core import GRID_WIDTH, GRID_HEIGHT
+
+
+HIGHER_IS_BETTER = {
+    "env_steps_per_sec": True,
+    "get_state_per_sec": True,
+    "replay_sample_ms": False,
+    "optimizer_steps_per_sec": True,
+    "episodes_to_target": False,
+}
+
+
+VARIANTS = {
+    "dqn": {},
+    "double": {"double": True},
+    "dueling": {"dueling": True},
+    "nstep": {"n_step": 3},
+    "soft": {"tau": 0.005},
+    "combined": {"double": True, "dueling": True, "n_step": 3, "tau": 0.005},
+}
+
+
+def seed_everything(seed):
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def bench_env_steps(steps=20000, **env_kwargs):
+    env = RLEnvironment(**env_kwargs)
+    start = time.perf_counter()
+    for _ in range(steps):
+        _, _, done = env.step(random.randint(0, 3))
+        if done:
+            env.reset()
+    return steps / (time.perf_counter() - start)
+
+
+def bench_get_state(calls=50000, **env_kwargs):
+    env = RLEnvironment(**env_kwargs)
+    start = time.perf_counter()
+    for _ in range(calls):
+        env.get_state()
+    return calls / (time.perf_counter() - start)
+
+
+def filled_memory(capacity=50000, **env_kwargs):
+    env = RLEnvironment(**env_kwargs)
+    state = env.reset()
+    memory = ReplayMemory(capacity, len(state))
+    for _ in range(capacity):
+        action = random.randint(0, 3)
+        next_state, reward, done = env.step(action)
+        memory.push((state, action, reward, next_state, done))
+        state = env.reset() if done else next_state
+    return memory
+
+
+def bench_replay_sample(memory, batch_size=64, samples=2000):
+    start = time.perf_counter()
+    for _ in range(samples):
+        states, actions, rewards, next_states, dones = memory.sample(batch_size)
+        torch.as_tensor(states, dtype=torch.float32)
+        torch.as_tensor(actions, dtype=torch.int64)
+        torch.as_tensor(rewards, dtype=torch.float32)
+        torch.as_tensor(next_states, dtype=torch.float32)
+        torch.as_tensor(dones, dtype=torch.bool)
+    return (time.perf_counter() - start) / samples * 1000.0
+
+
+def bench_optimizer_steps(memory, batch_size=64, steps=500):
+    device = torch.device("cpu")
+    policy_net = EnemyDQN(memory.state_dim, 4)
+    target_net = EnemyDQN(memory.state_dim, 4)
+    target_net.load_state_dict(policy_net.state_dict())
+    optimizer = optim.Adam(policy_net.parameters(), lr=1e-3)
+    start = time.perf_counter()
+    for _ in range(steps):
+        optimize_model(policy_net, target_net, optimizer, memory.sample(batch_size), 0.99, device)
+    return steps / (time.perf_counter() - start)
+
+
+def bench_episodes_to_target(target=0.0, max_episodes=400, window=50, variant="dqn", **env_kwargs):
+    with tempfile.TemporaryDirectory() as tmp:
+        history = train_dqn(
+            episodes=max_episodes, model_path=os.path.join(tmp, "bench.pth"), **VARIANTS[variant], **env_kwargs
+        )
+    for episode in range(window, len(history) + 1):
+        recent = history[episode - window:episode]
+        if sum(recent) / window >= target:
+            return episode
+    return max_episodes + 1
+
+
+def summarize(samples):
+    if len(samples) < 2:
+        return {"median": samples[0], "iqr": 0.0, "samples": samples}
+    q1, median, q3 = statistics.quantiles(samples, n=4, method="inclusive")
+    return {"median": median, "iqr": q3 - q1, "samples": samples}
+
+
+def run_benchmarks(
+    repeats=5,
+    seed=0,
+    convergence=False,
+    target=0.0,
+    max_episodes=400,
+    variant="dqn",
+    width=GRID_WIDTH,
+    height=GRID_HEIGHT,
+    view_radius=None,
+):
+    env_kwargs = {"width": width, "height": height, "view_radius": view_radius}
+    config = {"repeats": repeats, "seed": seed, **env_kwargs}
+    if convergence:
+        config.update(target=target, max_episodes=max_episodes, variant=variant)
+    torch.set_num_threads(1)
+    seed_everything(seed)
+    memory = filled_memory(**env_kwargs)
+    samples = {name: [] for name in HIGHER_IS_BETTER}
+    for repeat in range(repeats):
+        seed_everything(seed + repeat)
+        samples["env_steps_per_sec"].append(bench_env_steps(**env_kwargs))
+        samples["get_state_per_sec"].append(bench_get_state(**env_kwargs))
+        samples["replay_sample_ms"].append(bench_replay_sample(memory))
+        samples["optimizer_steps_per_sec"].append(bench_optimizer_steps(memory))
+        if convergence:
+            samples["episodes_to_target"].append(
+                bench_episodes_to_target(target, max_episodes, variant=variant, **env_kwargs)
+            )
+    results = {name: summarize(values) for name, values in samples.items() if values}
+    results["config"] = config
+    return results
+
+
+def config_differences(results, baseline):
+    config = results["config"]
+    old = baseline.get("config", {})
+    keys = sorted(set(config) | set(old))
+    return [f"{key}: {old.get(key)} -> {config.get(key)}" for key in keys if old.get(key) != config.get(key)]
+
+
+def compare(results, baseline, threshold=0.1):
+    regressions = []
+    for name, result in results.items():
+        if name not in HIGHER_IS_BETTER or name not in baseline:
+            continue
+        old = baseline[name]["median"]
+        new = result["median"]
+        if HIGHER_IS_BETTER[name]:
+            worse = new < old * (1.0 - threshold)
+        else:
+            worse = new > old * (1.0 + threshold)
+        if worse:
+            regressions.append(f"{name}: {old:.4g} -> {new:.4g}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--convergence", action="store_true")
+    parser.add_argument("--target", type=float, default=0.0)
+    parser.add_argument("--max-episodes", type=int, default=400)
+    parser.add_argument("--variant", choices=sorted(VARIANTS), default="dqn")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--baseline", default=None)
+    parser.add_argument("--threshold", type=float, default=0.1)
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--view-radius", type=int, default=None)
+    args = parser.parse_args()
+
+    results = run_benchmarks(
+        args.repeats,
+        args.seed,
+        args.convergence,
+        args.target,
+        args.max_episodes,
+        args.variant,
+        args.width,
+        args.height,
+        args.view_radius,
+    )
+    for name, result in results.items():
+        if name not in HIGHER_IS_BETTER:
+            continue
+        print(f"{name}: median {result['median']:.4g}, IQR {result['iqr']:.4g}")
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differences = config_differences(results, baseline)
+        if differences:
+            raise SystemExit(f"{args.baseline} was recorded with a different config: " + ", ".join(differences))
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            raise SystemExit(1)
@@ -0,0 +1,91 @@
+import numpy as np
+
+
+OWNER_PLAYER = 0
+OWNER_ENEMY = 1
+
+
+class BulletPool:
+    def __init__(self, capacity=64, speed=0.4):
+        self.speed = speed
+        self.x = np.zeros(capacity, dtype=np.float64)
+        self.y = np.zeros(capacity, dtype=np.float64)
+        self.dir_x = np.zeros(capacity, dtype=np.int8)
+        self.dir_y = np.zeros(capacity, dtype=np.int8)
+        self.owner = np.zeros(capacity, dtype=np.int8)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.free = list(range(capacity - 1, -1, -1))
+        self.count = 0
+
+    def grow(self):
+        old = len(self.alive)
+        for name in ("x", "y", "dir_x", "dir_y", "owner", "alive"):
+            array = getattr(self, name)
+            setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+        self.free.extend(range(2 * old - 1, old - 1, -1))
+
+    def spawn(self, grid_x, grid_y, dir_x, dir_y, owner):
+        if not self.free:
+            self.grow()
+        i = self.free.pop()
+        self.x[i] = grid_x + 0.5
+        self.y[i] = grid_y + 0.5
+        self.dir_x[i] = dir_x
+        self.dir_y[i] = dir_y
+        self.owner[i] = owner
+        self.alive[i] = True
+        self.count += 1
+        return i
+
+    def kill(self, indices):
+        if len(indices) == 0:
+            return
+        self.alive[indices] = False
+        self.free.extend(indices.tolist())
+        self.count -= len(indices)
+
+    def clear(self):
+        self.alive[:] = False
+        self.free = list(range(len(self.alive) - 1, -1, -1))
+        self.count = 0
+
+    def active(self):
+        return np.flatnonzero(self.alive)
+
+    def update(self, width, height):
+        idx = self.active()
+        if len(idx) == 0:
+            return
+        x = self.x[idx] + self.dir_x[idx] * self.speed
+        y = self.y[idx] + self.dir_y[idx] * self.speed
+        self.x[idx] = x
+        self.y[idx] = y
+        out = (x < 0) | (x >= width) | (y < 0) | (y >= height)
+        self.kill(idx[out])
+
+    def collide(self, blocked, entity_grid, owner=OWNER_PLAYER):
+        idx = np.flatnonzero(self.alive & (self.owner == owner))
+        if len(idx) == 0:
+            return idx
+        bx = self.x[idx].astype(np.int64)
+        by = self.y[idx].astype(np.int64)
+        targets = entity_grid[bx, by]
+        hit = targets >= 0
+        self.kill(idx[hit | blocked[bx, by]])
+        return targets[hit]
+
+    def snapshot(self):
+        return {
+            "arrays": [getattr(self, name).copy() for name in ("x", "y", "dir_x", "dir_y", "owner", "alive")],
+            "free": list(self.free),
+            "count": self.count,
+        }
+
+    def restore(self, snapshot):
+        for name, array in zip(("x", "y", "dir_x", "dir_y", "owner", "alive"), snapshot["arrays"]):
+            setattr(self, name, array.copy())
+        self.free = list(snapshot["free"])
+        self.count = snapshot["count"]
+
+    def __len__(self):
+        return self.count
@@ -0,0 +1,116 @@
+import copy
+import glob
+import os
+import queue
+import random
+import re
+import threading
+
+import numpy as np
+import torch
+
+
+CHECKPOINT_PATTERN = re.compile(r"checkpoint_(\d+)\.pt$")
+
+
+def capture_rng_state():
+    state = {
+        "python": random.getstate(),
+        "numpy": np.random.get_state(),
+        "torch": torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state["cuda"] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state):
+    random.setstate(state["python"])
+    np.random.set_state(state["numpy"])
+    torch.set_rng_state(state["torch"])
+    if "cuda" in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state["cuda"])
+
+
+def cpu_copy(state_dict):
+    return {key: value.detach().cpu().clone() for key, value in state_dict.items()}
+
+
+def training_state(episode, policy_net, target_net, optimizer, epsilon, reward_history, memory=None):
+    state = {
+        "episode": episode,
+        "policy_net": cpu_copy(policy_net.state_dict()),
+        "target_net": cpu_copy(target_net.state_dict()),
+        "optimizer": copy.deepcopy(optimizer.state_dict()),
+        "epsilon": epsilon,
+        "reward_history": list(reward_history),
+        "rng": capture_rng_state(),
+    }
+    if memory is not None:
+        state["memory"] = memory.state_dict()
+    return state
+
+
+def list_checkpoints(directory):
+    found = []
+    for path in glob.glob(os.path.join(directory, "checkpoint_*.pt")):
+        match = CHECKPOINT_PATTERN.search(path)
+        if match:
+            found.append((int(match.group(1)), path))
+    return [path for _, path in sorted(found)]
+
+
+def latest_checkpoint(path):
+    if os.path.isdir(path):
+        checkpoints = list_checkpoints(path)
+        if not checkpoints:
+            raise FileNotFoundError(f"no checkpoints in {path}")
+        return checkpoints[-1]
+    return path
+
+
+def load_checkpoint(path):
+    return torch.load(latest_checkpoint(path), map_location="cpu", weights_only=False)
+
+
+class CheckpointWriter:
+    def __init__(self, directory, keep=3):
+        self.directory = directory
+        self.keep = keep
+        os.makedirs(directory, exist_ok=True)
+        self.pending = queue.Queue(maxsize=2)
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, state):
+        if self.error is not None:
+            raise self.error
+        self.pending.put(state)
+
+    def run(self):
+        while True:
+            state = self.pending.get()
+            if state is None:
+                break
+            try:
+                self.write(state)
+            except Exception as exc:
+                self.error = exc
+
+    def write(self, state):
+        path = os.path.join(self.directory, f"checkpoint_{state['episode']:06d}.pt")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            torch.save(state, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        for old in list_checkpoints(self.directory)[:-self.keep]:
+            os.remove(old)
+
+    def close(self):
+        self.pending.put(None)
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
@@ -1,11 +1,18 @@
+import argparse
+import os
 import random
-from collections import deque
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
 
+from checkpointing import CheckpointWriter, load_checkpoint, restore_rng_state, training_state
+from features import view_radius_for
+from profiler import NULL_PROFILER, add_profiler_arguments, profiler_from_args
+from replay_memory import NStepWriter, PrioritizedReplayMemory, ReplayMemory
 from rl_env import RLEnvironment
+from sim_core import GRID_WIDTH, GRID_HEIGHT
+from transition_dataset import TransitionWriter, stream_batches
 
 
 class EnemyDQN(nn.Module):
@@ -23,20 +30,84 @@ class EnemyDQN(nn.Module):
         return self.net(x)
 
 
-class ReplayMemory:
-    def __init__(self, capacity):
-        self.buffer = deque(maxlen=capacity)
+class DuelingEnemyDQN(EnemyDQN):
+    def __init__(self, input_dim, output_dim):
+        super().__init__(input_dim, output_dim)
+        self.net = nn.Sequential(
+            nn.Linear(input_dim, 128),
+            nn.ReLU(),
+            nn.Linear(128, 128),
+            nn.ReLU(),
+        )
+        self.value = nn.Linear(128, 1)
+        self.advantage = nn.Linear(128, output_dim)
 
-    def push(self, transition):
-        self.buffer.append(transition)
+    def forward(self, x):
+        features = self.net(x)
+        advantage = self.advantage(features)
+        return self.value(features) + advantage - advantage.mean(1, keepdim=True)
 
-    def sample(self, batch_size):
-        batch = random.sample(self.buffer, batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
-        return states, actions, rewards, next_states, dones
 
-    def __len__(self):
-        return len(self.buffer)
+def build_enemy_dqn(input_dim, output_dim, dueling=False):
+    if dueling:
+        return DuelingEnemyDQN(input_dim, output_dim)
+    return EnemyDQN(input_dim, output_dim)
+
+
+def load_enemy_dqn(model_path, device, input_dim=None, action_dim=4):
+    state_dict = torch.load(model_path, map_location=device, weights_only=False)
+    if "policy_net" in state_dict:
+        state_dict = state_dict["policy_net"]
+    if input_dim is None:
+        input_dim = state_dict["net.0.weight"].shape[1]
+    model = build_enemy_dqn(input_dim, action_dim, dueling="value.weight" in state_dict).to(device)
+    model.load_state_dict(state_dict)
+    model.eval()
+    return model
+
+
+def model_view_radius(model):
+    return view_radius_for(model.net[0].in_features)
+
+
+def soft_update(target_net, policy_net, tau):
+    with torch.no_grad():
+        for target_param, param in zip(target_net.parameters(), policy_net.parameters()):
+            target_param.lerp_(param, tau)
+
+
+def optimize_model(
+    policy_net, target_net, optimizer, batch, gamma, device, weights=None, double=False, profiler=NULL_PROFILER
+):
+    states, actions, rewards, next_states, dones = batch
+    with profiler.phase("tensors"):
+        states_tensor = torch.as_tensor(states, dtype=torch.float32, device=device)
+        actions_tensor = torch.as_tensor(actions, dtype=torch.int64, device=device).unsqueeze(1)
+        rewards_tensor = torch.as_tensor(rewards, dtype=torch.float32, device=device).unsqueeze(1)
+        next_states_tensor = torch.as_tensor(next_states, dtype=torch.float32, device=device)
+        dones_tensor = torch.as_tensor(dones, dtype=torch.bool, device=device).unsqueeze(1)
+
+    with profiler.phase("forward"):
+        q_values = policy_net(states_tensor).gather(1, actions_tensor)
+        with torch.no_grad():
+            if double:
+                next_actions = policy_net(next_states_tensor).argmax(1, keepdim=True)
+                next_q_values = target_net(next_states_tensor).gather(1, next_actions)
+            else:
+                next_q_values = target_net(next_states_tensor).max(1, keepdim=True)[0]
+            target_q_values = rewards_tensor + gamma * next_q_values * (~dones_tensor)
+
+        td_errors = q_values - target_q_values
+        if weights is None:
+            loss = td_errors.pow(2).mean()
+        else:
+            loss = (torch.as_tensor(weights, device=device).unsqueeze(1) * td_errors.pow(2)).mean()
+    with profiler.phase("backward"):
+        optimizer.zero_grad()
+        loss.backward()
+    with profiler.phase("optimizer"):
+        optimizer.step()
+    return td_errors.detach().squeeze(1)
 
 
 def train_dqn(
@@ -51,57 +122,179 @@ def train_dqn(
     epsilon_decay=0.997,
     target_update_interval=10,
     model_path="enemy_dqn.pth",
+    num_workers=0,
+    weight_sync_interval=100,
+    replay_path=None,
+    prioritized=False,
+    priority_alpha=0.6,
+    priority_beta_start=0.4,
+    dataset_path=None,
+    dataset_epochs=1,
+    dataset_target_update=1000,
+    dataset_out=None,
+    report_callback=None,
+    checkpoint_dir=None,
+    checkpoint_interval=100,
+    checkpoint_keep=3,
+    checkpoint_replay=True,
+    resume=None,
+    layout_seeds=None,
+    double=False,
+    dueling=False,
+    n_step=1,
+    tau=None,
+    width=GRID_WIDTH,
+    height=GRID_HEIGHT,
+    view_radius=None,
+    profiler=None,
 ):
-    env = RLEnvironment(max_steps=max_steps)
+    if num_workers > 0:
+        from rollout_workers import train_dqn_parallel
+
+        unsupported = {
+            "prioritized": prioritized,
+            "replay_path": replay_path,
+            "dataset_path": dataset_path,
+            "dataset_out": dataset_out,
+            "checkpoint_dir": checkpoint_dir,
+            "resume": resume,
+            "report_callback": report_callback,
+            "profiler": profiler,
+        }
+        used = [name for name, value in unsupported.items() if value]
+        if used:
+            raise ValueError(f"num_workers > 0 does not support {', '.join(used)}")
+
+        return train_dqn_parallel(
+            episodes=episodes,
+            max_steps=max_steps,
+            gamma=gamma,
+            lr=lr,
+            batch_size=batch_size,
+            memory_capacity=memory_capacity,
+            epsilon_start=epsilon_start,
+            epsilon_end=epsilon_end,
+            epsilon_decay=epsilon_decay,
+            target_update_interval=target_update_interval,
+            model_path=model_path,
+            num_workers=num_workers,
+            weight_sync_interval=weight_sync_interval,
+            layout_seeds=layout_seeds,
+            double=double,
+            dueling=dueling,
+            n_step=n_step,
+            tau=tau,
+            width=width,
+            height=height,
+            view_radius=view_radius,
+        )
+
+    env = RLEnvironment(
+        max_steps=max_steps, layout_seeds=layout_seeds, width=width, height=height, view_radius=view_radius
+    )
     state = env.reset()
     state_dim = len(state)
     action_dim = 4
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    policy_net = EnemyDQN(state_dim, action_dim).to(device)
-    target_net = EnemyDQN(state_dim, action_dim).to(device)
+    policy_net = build_enemy_dqn(state_dim, action_dim, dueling).to(device)
+    target_net = build_enemy_dqn(state_dim, action_dim, dueling).to(device)
     target_net.load_state_dict(policy_net.state_dict())
     target_net.eval()
     optimizer = optim.Adam(policy_net.parameters(), lr=lr)
-    memory = ReplayMemory(memory_capacity)
+    if prioritized:
+        memory = PrioritizedReplayMemory(
+            memory_capacity,
+            state_dim,
+            alpha=priority_alpha,
+            beta_start=priority_beta_start,
+            beta_steps=episodes * max_steps,
+        )
+    else:
+        memory = ReplayMemory(memory_capacity, state_dim)
+    if replay_path is not None and os.path.exists(os.path.join(replay_path, "meta.npy")):
+        memory.load(replay_path)
     epsilon = epsilon_start
-
     reward_history = []
-    for episode in range(episodes):
-        state = env.reset()
+    start_episode = 0
+    if resume is not None:
+        checkpoint = load_checkpoint(resume)
+        policy_net.load_state_dict(checkpoint["policy_net"])
+        target_net.load_state_dict(checkpoint["target_net"])
+        optimizer.load_state_dict(checkpoint["optimizer"])
+        if "memory" in checkpoint:
+            memory.load_state_dict(checkpoint["memory"])
+        epsilon = checkpoint["epsilon"]
+        reward_history = checkpoint["reward_history"]
+        start_episode = checkpoint["episode"]
+        restore_rng_state(checkpoint["rng"])
+
+    if dataset_path is not None and resume is None:
+        for step, batch in enumerate(stream_batches(dataset_path, batch_size, epochs=dataset_epochs)):
+            if batch[0].shape[1] != state_dim:
+                raise ValueError(f"{dataset_path} holds {batch[0].shape[1]}-feature states, this run observes {state_dim}")
+            optimize_model(policy_net, target_net, optimizer, batch, gamma, device, double=double)
+            if (step + 1) % dataset_target_update == 0:
+                target_net.load_state_dict(policy_net.state_dict())
+        target_net.load_state_dict(policy_net.state_dict())
+    if profiler is None:
+        profiler = NULL_PROFILER
+    bootstrap_gamma = gamma**n_step
+    transitions = NStepWriter(memory, n_step, gamma) if n_step > 1 else memory
+    writer = TransitionWriter(dataset_out, state_dim=state_dim) if dataset_out is not None else None
+    checkpoints = CheckpointWriter(checkpoint_dir, keep=checkpoint_keep) if checkpoint_dir is not None else None
+
+    state_tensors = [torch.zeros(1, state_dim, dtype=torch.float32) for _ in range(2)]
+    state_buffers = [t.numpy()[0] for t in state_tensors]
+    for episode in range(start_episode, episodes):
+        env.reset()
+        current = 0
+        state = env.get_state(state_buffers[current])
         done = False
         total_reward = 0.0
         step_count = 0
         while not done and step_count < max_steps:
             step_count += 1
-            if random.random() < epsilon:
-                action = random.randint(0, action_dim - 1)
-            else:
-                with torch.no_grad():
-                    s = torch.tensor(state, dtype=torch.float32, device=device).unsqueeze(0)
-                    q_values = policy_net(s)
-                    action = int(torch.argmax(q_values, dim=1).item())
-            next_state, reward, done = env.step(action)
+            with profiler.phase("act"):
+                if random.random() < epsilon:
+                    action = random.randint(0, action_dim - 1)
+                else:
+                    with torch.no_grad():
+                        q_values = policy_net(state_tensors[current].to(device))
+                        action = int(torch.argmax(q_values, dim=1).item())
+            with profiler.phase("env_step"):
+                next_state, reward, done = env.step(action, state_buffers[1 - current])
             total_reward += reward
-            memory.push((state, action, reward, next_state, done))
+            with profiler.phase("replay_push"):
+                transitions.push((state, action, reward, next_state, done))
+                if writer is not None:
+                    writer.push((state, action, reward, next_state, done))
+            current = 1 - current
             state = next_state
 
             if len(memory) >= batch_size:
-                states, actions, rewards, next_states, dones = memory.sample(batch_size)
-                states_tensor = torch.tensor(states, dtype=torch.float32, device=device)
-                actions_tensor = torch.tensor(actions, dtype=torch.int64, device=device).unsqueeze(1)
-                rewards_tensor = torch.tensor(rewards, dtype=torch.float32, device=device).unsqueeze(1)
-                next_states_tensor = torch.tensor(next_states, dtype=torch.float32, device=device)
-                dones_tensor = torch.tensor(dones, dtype=torch.bool, device=device).unsqueeze(1)
-
-                q_values = policy_net(states_tensor).gather(1, actions_tensor)
-                with torch.no_grad():
-                    next_q_values = target_net(next_states_tensor).max(1, keepdim=True)[0]
-                    target_q_values = rewards_tensor + gamma * next_q_values * (~dones_tensor)
-
-                loss = nn.functional.mse_loss(q_values, target_q_values)
-                optimizer.zero_grad()
-                loss.backward()
-                optimizer.step()
+                with profiler.phase("replay_sample"):
+                    batch = memory.sample(batch_size)
+                if prioritized:
+                    td_errors = optimize_model(
+                        policy_net,
+                        target_net,
+                        optimizer,
+                        batch,
+                        bootstrap_gamma,
+                        device,
+                        weights=memory.weights,
+                        double=double,
+                        profiler=profiler,
+                    )
+                    with profiler.phase("priority_update"):
+                        memory.update_priorities(td_errors.cpu().numpy())
+                else:
+                    optimize_model(
+                        policy_net, target_net, optimizer, batch, bootstrap_gamma, device, double=double, profiler=profiler
+                    )
+                if tau is not None:
+                    soft_update(target_net, policy_net, tau)
+            profiler.step()
 
         reward_history.append(total_reward)
         if epsilon > epsilon_end:
@@ -109,15 +302,90 @@ def train_dqn(
             if epsilon < epsilon_end:
                 epsilon = epsilon_end
 
-        if (episode + 1) % target_update_interval == 0:
+        if tau is None and (episode + 1) % target_update_interval == 0:
             target_net.load_state_dict(policy_net.state_dict())
+        if checkpoints is not None and (episode + 1) % checkpoint_interval == 0:
+            checkpoints.submit(
+                training_state(
+                    episode + 1,
+                    policy_net,
+                    target_net,
+                    optimizer,
+                    epsilon,
+                    reward_history,
+                    memory if checkpoint_replay else None,
+                )
+            )
         if (episode + 1) % 50 == 0:
             recent = reward_history[-50:]
             avg_r = sum(recent) / len(recent)
             print(f"Episode {episode + 1}, avg reward {avg_r:.2f}, epsilon {epsilon:.3f}")
+            if profiler.enabled:
+                print(profiler.report())
+            if report_callback is not None and report_callback(episode + 1, avg_r) is False:
+                break
 
     torch.save(policy_net.state_dict(), model_path)
+    if checkpoints is not None:
+        checkpoints.close()
+    if writer is not None:
+        writer.close()
+    if replay_path is not None:
+        memory.save(replay_path)
+    profiler.finish()
+    return reward_history
 
 
 if __name__ == "__main__":
-    train_dqn()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=1500)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="parallel rollout workers; cannot be combined with --prioritized, --replay-path, --dataset-path, "
+        "--dataset-out, --checkpoint-dir, --resume or profiling",
+    )
+    parser.add_argument("--weight-sync-interval", type=int, default=100)
+    parser.add_argument("--model-path", default="enemy_dqn.pth")
+    parser.add_argument("--replay-path", default=None)
+    parser.add_argument("--prioritized", action="store_true")
+    parser.add_argument("--dataset-path", default=None)
+    parser.add_argument("--dataset-epochs", type=int, default=1)
+    parser.add_argument("--dataset-out", default=None)
+    parser.add_argument("--checkpoint-dir", default=None)
+    parser.add_argument("--checkpoint-interval", type=int, default=100)
+    parser.add_argument("--resume", default=None)
+    parser.add_argument("--layouts", type=int, default=0)
+    parser.add_argument("--double", action="store_true")
+    parser.add_argument("--dueling", action="store_true")
+    parser.add_argument("--n-step", type=int, default=1)
+    parser.add_argument("--tau", type=float, default=None)
+    parser.add_argument("--width", type=int, default=GRID_WIDTH)
+    parser.add_argument("--height", type=int, default=GRID_HEIGHT)
+    parser.add_argument("--view-radius", type=int, default=None)
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
+    train_dqn(
+        episodes=args.episodes,
+        model_path=args.model_path,
+        num_workers=args.workers,
+        weight_sync_interval=args.weight_sync_interval,
+        replay_path=args.replay_path,
+        prioritized=args.prioritized,
+        dataset_path=args.dataset_path,
+        dataset_epochs=args.dataset_epochs,
+        dataset_out=args.dataset_out,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_interval=args.checkpoint_interval,
+        resume=args.resume,
+        layout_seeds=range(args.layouts) if args.layouts else None,
+        double=args.double,
+        dueling=args.dueling,
+        n_step=args.n_step,
+        tau=args.tau,
+        width=args.width,
+        height=args.height,
+        view_radius=args.view_radius,
+        profiler=profiler_from_args(args),
+    )
@@ -0,0 +1,162 @@
+import math
+from functools import lru_cache
+
+import numpy as np
+
+from grid import GRID_WIDTH, GRID_HEIGHT
+from wall_bits import WallBits, wall_key
+
+
+STATE_DIM = 11
+EGO_TARGET_DIM = 4
+BLOCK_UP = 1
+BLOCK_DOWN = 2
+BLOCK_LEFT = 4
+BLOCK_RIGHT = 8
+
+
+def blocked_direction_bits(walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+    if not isinstance(walls, WallBits):
+        walls = WallBits.from_cells(walls, width, height)
+    solid = walls.padded()
+    bits = np.zeros((width, height), dtype=np.uint8)
+    bits |= np.where(solid[1:-1, :-2], BLOCK_UP, 0).astype(np.uint8)
+    bits |= np.where(solid[1:-1, 2:], BLOCK_DOWN, 0).astype(np.uint8)
+    bits |= np.where(solid[:-2, 1:-1], BLOCK_LEFT, 0).astype(np.uint8)
+    bits |= np.where(solid[2:, 1:-1], BLOCK_RIGHT, 0).astype(np.uint8)
+    return bits
+
+
+class Featurizer:
+    state_dim = STATE_DIM
+
+    def __init__(self, walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.blocked_bits = blocked_direction_bits(walls, width, height)
+        flags = [BLOCK_UP, BLOCK_DOWN, BLOCK_LEFT, BLOCK_RIGHT]
+        self.block_features = np.stack([(self.blocked_bits & flag) != 0 for flag in flags], axis=-1).astype(np.float32)
+        self.dx_table = (np.arange(-(width - 1), width) / width).astype(np.float32)
+        self.dy_table = (np.arange(-(height - 1), height) / height).astype(np.float32)
+        self.dist_table = (np.arange(width + height - 1) / (width + height)).astype(np.float32)
+        self.x_table = (np.arange(width) / width).astype(np.float32)
+        self.y_table = (np.arange(height) / height).astype(np.float32)
+
+    def write_state(self, out, ex, ey, px, py):
+        dx = px - ex
+        dy = py - ey
+        out[0] = self.dx_table[dx + self.width - 1]
+        out[1] = self.dy_table[dy + self.height - 1]
+        out[2] = self.dist_table[abs(dx) + abs(dy)]
+        out[3:7] = self.block_features[ex, ey]
+        out[7] = self.x_table[px]
+        out[8] = self.y_table[py]
+        out[9] = self.x_table[ex]
+        out[10] = self.y_table[ey]
+        return out
+
+    def state(self, ex, ey, px, py):
+        return self.write_state(np.empty(STATE_DIM, dtype=np.float32), ex, ey, px, py)
+
+    def write_batch(self, out, ex, ey, px, py):
+        dx = px - ex
+        dy = py - ey
+        out[:, 0] = self.dx_table[dx + self.width - 1]
+        out[:, 1] = self.dy_table[dy + self.height - 1]
+        out[:, 2] = self.dist_table[np.abs(dx) + np.abs(dy)]
+        out[:, 3:7] = self.block_features[ex, ey]
+        out[:, 7] = self.x_table[px]
+        out[:, 8] = self.y_table[py]
+        out[:, 9] = self.x_table[ex]
+        out[:, 10] = self.y_table[ey]
+        return out
+
+    def batch(self, ex, ey, px, py):
+        return self.write_batch(np.empty((len(ex), STATE_DIM), dtype=np.float32), ex, ey, px, py)
+
+
+@lru_cache(maxsize=16)
+def cached_featurizer(walls, width, height):
+    return Featurizer(walls, width, height)
+
+
+def get_featurizer(walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+    return cached_featurizer(wall_key(walls), width, height)
+
+
+def observation_dim(view_radius=None):
+    if view_radius is None:
+        return STATE_DIM
+    return (2 * view_radius + 1) ** 2 + EGO_TARGET_DIM
+
+
+def view_radius_for(input_dim):
+    if input_dim == STATE_DIM:
+        return None
+    side = math.isqrt(max(input_dim - EGO_TARGET_DIM, 0))
+    if side % 2 == 0 or side * side + EGO_TARGET_DIM != input_dim:
+        raise ValueError(f"no observation has {input_dim} features")
+    return side // 2
+
+
+def write_target(out, dx, dy, scale):
+    norm = np.maximum(np.abs(dx) + np.abs(dy), 1)
+    out[..., 0] = np.clip(dx / scale, -1.0, 1.0)
+    out[..., 1] = np.clip(dy / scale, -1.0, 1.0)
+    out[..., 2] = dx / norm
+    out[..., 3] = dy / norm
+
+
+class EgocentricFeaturizer:
+    def __init__(self, walls, width=GRID_WIDTH, height=GRID_HEIGHT, view_radius=4):
+        if not isinstance(walls, WallBits):
+            walls = WallBits.from_cells(walls, width, height)
+        self.walls = walls
+        self.view_radius = view_radius
+        self.state_dim = observation_dim(view_radius)
+        self.patch = self.state_dim - EGO_TARGET_DIM
+        offsets = np.arange(-view_radius, view_radius + 1)
+        self.offset_x = np.repeat(offsets, len(offsets))
+        self.offset_y = np.tile(offsets, len(offsets))
+        self.index_offsets = self.offset_x * walls.height + self.offset_y
+        self.target_scale = float(4 * view_radius)
+
+    def write_state(self, out, ex, ey, px, py):
+        r = self.view_radius
+        walls = self.walls
+        if r <= ex < walls.width - r and r <= ey < walls.height - r:
+            out[:self.patch] = walls.lookup(self.index_offsets + (ex * walls.height + ey))
+        else:
+            out[:self.patch] = walls.blocked_at(ex + self.offset_x, ey + self.offset_y)
+        dx = px - ex
+        dy = py - ey
+        norm = max(abs(dx) + abs(dy), 1)
+        out[self.patch] = min(max(dx / self.target_scale, -1.0), 1.0)
+        out[self.patch + 1] = min(max(dy / self.target_scale, -1.0), 1.0)
+        out[self.patch + 2] = dx / norm
+        out[self.patch + 3] = dy / norm
+        return out
+
+    def state(self, ex, ey, px, py):
+        return self.write_state(np.empty(self.state_dim, dtype=np.float32), ex, ey, px, py)
+
+    def write_batch(self, out, ex, ey, px, py):
+        ex = np.asarray(ex)
+        ey = np.asarray(ey)
+        out[:, :self.patch] = self.walls.blocked_at(ex[:, None] + self.offset_x, ey[:, None] + self.offset_y)
+        write_target(out[:, self.patch:], px - ex, py - ey, self.target_scale)
+        return out
+
+    def batch(self, ex, ey, px, py):
+        return self.write_batch(np.empty((len(ex), self.state_dim), dtype=np.float32), ex, ey, px, py)
+
+
+@lru_cache(maxsize=16)
+def cached_egocentric_featurizer(walls, width, height, view_radius):
+    return EgocentricFeaturizer(walls, width, height, view_radius)
+
+
+def featurizer_for(walls, width=GRID_WIDTH, height=GRID_HEIGHT, view_radius=None):
+    if view_radius is None:
+        return get_featurizer(walls, width, height)
+    return cached_egocentric_featurizer(wall_key(walls), width, height, view_radius)
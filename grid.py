@@ -0,0 +1,2 @@
+GRID_WIDTH = 28
+GRID_HEIGHT = 18
@@ -0,0 +1,104 @@
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+
+class InferenceServer:
+    def __init__(self, model, device, max_batch=64, max_wait=0.002, history=100000):
+        self.model = model
+        self.device = device
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.latencies = deque(maxlen=history)
+        self.batch_sizes = Counter()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.requests.put(None)
+        self.thread.join()
+        self.thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def submit(self, state):
+        future = Future()
+        self.requests.put((time.perf_counter(), state, future))
+        return future
+
+    def act(self, state):
+        return self.submit(state).result()
+
+    def collect(self):
+        first = self.requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = first[0] + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self.requests.get(timeout=remaining) if remaining > 0 else self.requests.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                self.requests.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def serve(self):
+        while True:
+            batch = self.collect()
+            if batch is None:
+                break
+            try:
+                states = torch.from_numpy(np.array([state for _, state, _ in batch], dtype=np.float32)).to(self.device)
+                with torch.no_grad():
+                    actions = torch.argmax(self.model(states), dim=1).tolist()
+            except Exception as exc:
+                for _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+            done = time.perf_counter()
+            for (_, _, future), action in zip(batch, actions):
+                future.set_result(action)
+            with self.lock:
+                for submitted, _, _ in batch:
+                    self.latencies.append(done - submitted)
+                self.batch_sizes[len(batch)] += 1
+
+    def latency_percentiles(self, percentiles=(50, 99)):
+        with self.lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return {p: 0.0 for p in percentiles}
+        return {p: samples[min(len(samples) - 1, int(len(samples) * p / 100))] for p in percentiles}
+
+    def batch_size_histogram(self):
+        with self.lock:
+            return dict(sorted(self.batch_sizes.items()))
+
+    def report(self):
+        pct = self.latency_percentiles()
+        hist = self.batch_size_histogram()
+        decisions = sum(size * count for size, count in hist.items())
+        return (
+            f"decisions {decisions}, p50 {pct[50] * 1000:.3f} ms, p99 {pct[99] * 1000:.3f} ms, "
+            f"batch sizes {hist}"
+        )
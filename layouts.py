@@ -0,0 +1,158 @@
+import random
+from functools import lru_cache
+
+import numpy as np
+
+from features import EgocentricFeaturizer, Featurizer
+from pathfinding import PathFinder
+from sim_core import GRID_WIDTH, GRID_HEIGHT, generate_walls
+from wall_bits import WallBits
+
+
+LAYOUT_CACHE_SIZE = 256
+CORRIDOR_BAND = 16
+RING = [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)]
+
+
+def start_cells(width=GRID_WIDTH, height=GRID_HEIGHT):
+    return [(3, height // 2), (width - 4, height // 2)]
+
+
+def keeps_connectivity(solid, x, y):
+    width, height = solid.shape
+    ring = [0 <= x + dx < width and 0 <= y + dy < height and not solid[x + dx, y + dy] for dx, dy in RING]
+    if all(ring):
+        return True
+    start = ring.index(False)
+    runs = set()
+    run = 0
+    for k in range(1, 9):
+        i = (start + k) % 8
+        if not ring[i]:
+            run += 1
+        elif i % 2 == 1:
+            runs.add(run)
+    return len(runs) <= 1
+
+
+def carve_corridor(solid, a, b, rng):
+    (ax, ay), (bx, by) = a, b
+    if rng.random() < 0.5:
+        solid[min(ax, bx):max(ax, bx) + 1, ay] = False
+        solid[bx, min(ay, by):max(ay, by) + 1] = False
+    else:
+        solid[ax, min(ay, by):max(ay, by) + 1] = False
+        solid[min(ax, bx):max(ax, bx) + 1, by] = False
+
+
+def generate_layout(seed, width=GRID_WIDTH, height=GRID_HEIGHT, max_rooms=None, obstacle_density=0.05):
+    rng = random.Random(seed)
+    if max_rooms is None:
+        max_rooms = max(8, width * height // 64)
+    solid = np.ones((width, height), dtype=bool)
+    rooms = []
+    for _ in range(max_rooms * 4):
+        if len(rooms) >= max_rooms:
+            break
+        w = rng.randint(3, min(7, width - 2))
+        h = rng.randint(3, min(5, height - 2))
+        x = rng.randint(1, width - w - 1)
+        y = rng.randint(1, height - h - 1)
+        if not solid[x - 1:x + w + 1, y - 1:y + h + 1].all():
+            continue
+        solid[x:x + w, y:y + h] = False
+        rooms.append((x, y, w, h))
+    starts = start_cells(width, height)
+    centers = [(x + w // 2, y + h // 2) for x, y, w, h in rooms] + starts
+    centers.sort(key=lambda c: (c[0] // CORRIDOR_BAND, c[1] if c[0] // CORRIDOR_BAND % 2 == 0 else -c[1]))
+    for a, b in zip(centers, centers[1:]):
+        carve_corridor(solid, a, b, rng)
+
+    open_cells = [(int(x), int(y)) for x, y in np.argwhere(~solid)]
+    rng.shuffle(open_cells)
+    obstacles = int(len(open_cells) * obstacle_density)
+    for cell in open_cells:
+        if obstacles == 0:
+            break
+        if cell in starts or not keeps_connectivity(solid, *cell):
+            continue
+        solid[cell] = True
+        obstacles -= 1
+    return solid
+
+
+class Layout:
+    def __init__(self, solid, seed=None):
+        self.seed = seed
+        self.width, self.height = solid.shape
+        self.walls = WallBits.from_dense(solid).freeze()
+        self.bits = self.walls.bits
+        self._featurizer = None
+        self._egocentric = {}
+        self._pathfinder = None
+
+    @property
+    def blocked(self):
+        return self.walls.dense()
+
+    @property
+    def featurizer(self):
+        if self._featurizer is None:
+            self._featurizer = Featurizer(self.walls, self.width, self.height)
+        return self._featurizer
+
+    def egocentric_featurizer(self, view_radius):
+        if view_radius not in self._egocentric:
+            self._egocentric[view_radius] = EgocentricFeaturizer(self.walls, self.width, self.height, view_radius)
+        return self._egocentric[view_radius]
+
+    @property
+    def blocked_bits(self):
+        return self.featurizer.blocked_bits
+
+    @property
+    def pathfinder(self):
+        if self._pathfinder is None:
+            self._pathfinder = PathFinder(self.walls, self.width, self.height)
+        return self._pathfinder
+
+    @property
+    def distances(self):
+        return self.pathfinder.dist
+
+
+@lru_cache(maxsize=LAYOUT_CACHE_SIZE)
+def get_layout(seed, width=GRID_WIDTH, height=GRID_HEIGHT):
+    return Layout(generate_layout(seed, width, height), seed=seed)
+
+
+@lru_cache(maxsize=4)
+def fixed_layout(width=GRID_WIDTH, height=GRID_HEIGHT):
+    return Layout(generate_walls(width, height).dense())
+
+
+def warm_layouts(seeds, width=GRID_WIDTH, height=GRID_HEIGHT, distances=False):
+    for seed in seeds:
+        layout = get_layout(seed, width, height)
+        if distances:
+            layout.pathfinder
+
+
+def spawn_cells(walls, origin, count, min_distance=8, rng=random, width=GRID_WIDTH, height=GRID_HEIGHT):
+    ox, oy = origin
+    cells = []
+    for _ in range(count * 64):
+        if len(cells) == count:
+            return cells
+        cell = (rng.randrange(width), rng.randrange(height))
+        if cell not in walls and cell not in cells and abs(cell[0] - ox) + abs(cell[1] - oy) >= min_distance:
+            cells.append(cell)
+    candidates = [
+        (x, y)
+        for x in range(width)
+        for y in range(height)
+        if (x, y) not in walls and abs(x - ox) + abs(y - oy) >= min_distance
+    ]
+    if len(candidates) >= count:
+        return rng.sample(candidates, count)
+    return [rng.choice(candidates) for _ in range(count)]
@@ -0,0 +1,134 @@
+import random
+import struct
+
+import numpy as np
+
+from sim_core import Simulation
+
+
+LOG_MAGIC = b"QDML"
+LOG_VERSION = 1
+HEADER_FORMAT = "<4sHQBH"
+RECORD_DTYPE = np.dtype([("inputs", "<u2"), ("action", "i1")])
+
+
+class MatchRecorder:
+    def __init__(self, path, seed, model="", step_phase=0, buffer_size=65536):
+        self.path = path
+        self.seed = seed
+        self.file = open(path, "wb", buffering=buffer_size)
+        model_bytes = model.encode("utf-8")
+        self.file.write(struct.pack(HEADER_FORMAT, LOG_MAGIC, LOG_VERSION, seed, step_phase, len(model_bytes)))
+        self.file.write(model_bytes)
+        self.record_struct = struct.Struct("<Hb")
+
+    def record(self, inputs, action):
+        self.file.write(self.record_struct.pack(inputs, action))
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class MatchLog:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(HEADER_FORMAT))
+            magic, version, seed, step_phase, model_len = struct.unpack(HEADER_FORMAT, header)
+            if magic != LOG_MAGIC:
+                raise ValueError(f"{path} is not a match log")
+            if version != LOG_VERSION:
+                raise ValueError(f"unsupported match log version {version}")
+            self.model = f.read(model_len).decode("utf-8")
+            offset = f.tell()
+        self.path = path
+        self.version = version
+        self.seed = seed
+        self.step_phase = step_phase
+        self.records = np.fromfile(path, dtype=RECORD_DTYPE, offset=offset)
+        self.inputs = self.records["inputs"]
+        self.actions = self.records["action"]
+
+    def __len__(self):
+        return len(self.records)
+
+
+def start_recording(sim, path, model=""):
+    seed = random.randrange(2**63)
+    random.seed(seed)
+    sim.recorder = MatchRecorder(path, seed, model=model, step_phase=sim.enemy_step_counter)
+    return sim.recorder
+
+
+class ReplaySimulator:
+    def __init__(self, log, snapshot_interval=500):
+        if isinstance(log, str):
+            log = MatchLog(log)
+        self.log = log
+        self.snapshot_interval = snapshot_interval
+        self.sim = Simulation(enemy_controller=self.logged_action)
+        self.on_decision = None
+        self.snapshots = []
+        self.rewind()
+
+    def logged_action(self, sim):
+        action = int(self.log.actions[sim.tick])
+        if self.on_decision is not None:
+            self.on_decision(sim, action)
+        return action
+
+    def rewind(self):
+        self.sim.reset()
+        self.sim.enemy_step_counter = self.log.step_phase
+        if not self.snapshots:
+            self.snapshots.append(self.sim.snapshot())
+
+    def step(self):
+        sim = self.sim
+        sim.update(int(self.log.inputs[sim.tick]))
+        if sim.tick % self.snapshot_interval == 0 and sim.tick // self.snapshot_interval == len(self.snapshots):
+            self.snapshots.append(sim.snapshot())
+
+    def run(self):
+        while self.sim.tick < len(self.log):
+            self.step()
+        return self.sim
+
+    def seek(self, tick):
+        tick = min(tick, len(self.log))
+        index = min(tick // self.snapshot_interval, len(self.snapshots) - 1)
+        if self.sim.tick > tick or self.snapshots[index]["tick"] > self.sim.tick:
+            self.sim.restore(self.snapshots[index])
+        while self.sim.tick < tick:
+            self.step()
+        return self.sim
+
+
+def rescore(log, controller):
+    replay = ReplaySimulator(log)
+    counts = [0, 0]
+
+    def compare(sim, logged):
+        counts[1] += 1
+        if controller(sim) == logged:
+            counts[0] += 1
+
+    replay.on_decision = compare
+    replay.run()
+    return counts[0], counts[1]
+
+
+def rescore_logs(paths, controller):
+    agree = 0
+    total = 0
+    for path in paths:
+        a, t = rescore(path, controller)
+        agree += a
+        total += t
+    return agree / total if total else 0.0
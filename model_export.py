@@ -0,0 +1,140 @@
+import argparse
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from dqn_agent import load_enemy_dqn, model_view_radius
+from features import STATE_DIM, observation_dim
+from layouts import fixed_layout
+from policy_table import cell_pair_states
+from sim_core import GRID_WIDTH, GRID_HEIGHT
+
+
+ARTIFACT_NAMES = ("enemy_dqn_int8.pt", "enemy_dqn.pt", "enemy_dqn.onnx")
+
+
+def example_input(batch_size=1, input_dim=STATE_DIM):
+    return torch.zeros(batch_size, input_dim, dtype=torch.float32)
+
+
+def export_torchscript(model, path, input_dim=STATE_DIM):
+    traced = torch.jit.trace(model, example_input(input_dim=input_dim))
+    traced.save(path, _extra_files={"input_dim": str(input_dim)})
+
+
+def quantize_dynamic(model):
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def export_onnx(model, path, input_dim=STATE_DIM):
+    torch.onnx.export(
+        model,
+        (example_input(input_dim=input_dim),),
+        path,
+        input_names=["state"],
+        output_names=["q_values"],
+        dynamic_axes={"state": {0: "batch"}, "q_values": {0: "batch"}},
+        dynamo=False,
+    )
+
+
+def load_artifact(path):
+    if path.endswith(".onnx"):
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+
+        def run_onnx(states):
+            return session.run(None, {"state": np.asarray(states, dtype=np.float32)})[0]
+
+        return run_onnx
+    module = torch.jit.load(path, map_location="cpu")
+    module.eval()
+
+    def run_torchscript(states):
+        with torch.inference_mode():
+            return module(torch.as_tensor(states, dtype=torch.float32)).numpy()
+
+    return run_torchscript
+
+
+def artifact_input_dim(path):
+    if path.endswith(".onnx"):
+        import onnxruntime
+
+        session = onnxruntime.InferenceSession(path, providers=["CPUExecutionProvider"])
+        return int(session.get_inputs()[0].shape[1])
+    extra_files = {"input_dim": ""}
+    torch.jit.load(path, map_location="cpu", _extra_files=extra_files)
+    return int(extra_files["input_dim"] or STATE_DIM)
+
+
+def find_artifact(directory):
+    for name in ARTIFACT_NAMES:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"no exported model in {directory}")
+
+
+def sample_states(count=10000, seed=0, view_radius=None):
+    rng = np.random.default_rng(seed)
+    total = (GRID_WIDTH * GRID_HEIGHT) ** 2
+    walls = fixed_layout().walls
+    picks = np.sort(rng.choice(total, size=min(count, total), replace=False))
+    return cell_pair_states(walls, picks, view_radius)
+
+
+def verify_artifact(model, path, states):
+    with torch.no_grad():
+        reference = model(torch.from_numpy(states)).numpy()
+    q_values = load_artifact(path)(states)
+    return {
+        "artifact": path,
+        "max_q_deviation": float(np.abs(q_values - reference).max()),
+        "action_agreement": float((q_values.argmax(1) == reference.argmax(1)).mean()),
+    }
+
+
+def export_all(model_path="enemy_dqn.pth", out_dir="exported", quantize=True, onnx=True, sample_size=10000):
+    os.makedirs(out_dir, exist_ok=True)
+    with torch.no_grad():
+        model = load_enemy_dqn(model_path, torch.device("cpu"))
+        view_radius = model_view_radius(model)
+        input_dim = observation_dim(view_radius)
+        paths = [os.path.join(out_dir, "enemy_dqn.pt")]
+        export_torchscript(model, paths[0], input_dim)
+        if quantize:
+            paths.append(os.path.join(out_dir, "enemy_dqn_int8.pt"))
+            export_torchscript(quantize_dynamic(model), paths[-1], input_dim)
+        if onnx:
+            paths.append(os.path.join(out_dir, "enemy_dqn.onnx"))
+            export_onnx(model, paths[-1], input_dim)
+        states = sample_states(sample_size, view_radius=view_radius)
+        reports = []
+        for path in paths:
+            try:
+                report = verify_artifact(model, path, states)
+            except ImportError as exc:
+                print(f"{path}: skipped verification ({exc})")
+                continue
+            report["bytes"] = os.path.getsize(path)
+            reports.append(report)
+            print(
+                f"{path}: max |dQ| {report['max_q_deviation']:.6f}, "
+                f"action agreement {report['action_agreement'] * 100:.2f}%, {report['bytes']} bytes"
+            )
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", default="enemy_dqn.pth")
+    parser.add_argument("--out-dir", default="exported")
+    parser.add_argument("--no-quantize", action="store_true")
+    parser.add_argument("--no-onnx", action="store_true")
+    parser.add_argument("--sample-size", type=int, default=10000)
+    args = parser.parse_args()
+    export_all(args.model_path, args.out_dir, not args.no_quantize, not args.no_onnx, args.sample_size)
@@ -0,0 +1,111 @@
+from functools import lru_cache
+
+import numpy as np
+
+from sim_core import GRID_WIDTH, GRID_HEIGHT, ACTION_DELTAS
+from wall_bits import wall_key
+
+
+UNREACHABLE = np.iinfo(np.uint16).max
+NO_ACTION = 255
+
+
+class PathFinder:
+    def __init__(self, walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.width = width
+        self.height = height
+        self.cells = width * height
+        self.walls = frozenset(walls)
+        self.blocked = np.zeros((width, height), dtype=bool)
+        for wx, wy in self.walls:
+            if 0 <= wx < width and 0 <= wy < height:
+                self.blocked[wx, wy] = True
+        self.neighbors = self.build_neighbors()
+        self.dist = self.build_distances()
+        self.next_hop = self.build_next_hop()
+
+    def cell(self, x, y):
+        return x * self.height + y
+
+    def build_neighbors(self):
+        xs, ys = np.unravel_index(np.arange(self.cells), (self.width, self.height))
+        neighbors = np.full((self.cells, len(ACTION_DELTAS)), -1, dtype=np.int64)
+        for a, (dx, dy) in enumerate(ACTION_DELTAS):
+            nx = xs + dx
+            ny = ys + dy
+            inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+            open_cell = np.zeros(self.cells, dtype=bool)
+            open_cell[inside] = ~self.blocked[nx[inside], ny[inside]]
+            neighbors[open_cell, a] = nx[open_cell] * self.height + ny[open_cell]
+        return neighbors
+
+    def build_distances(self):
+        dist = np.full((self.cells, self.cells), UNREACHABLE, dtype=np.uint16)
+        frontier = np.eye(self.cells, dtype=bool)
+        reached = frontier.copy()
+        np.fill_diagonal(dist, 0)
+        depth = 0
+        while frontier.any():
+            depth += 1
+            expanded = np.zeros_like(frontier)
+            for a in range(len(ACTION_DELTAS)):
+                valid = self.neighbors[:, a] >= 0
+                expanded[:, self.neighbors[valid, a]] |= frontier[:, valid]
+            frontier = expanded & ~reached
+            reached |= frontier
+            dist[frontier] = depth
+        blocked_cells = np.flatnonzero(self.blocked.reshape(-1))
+        if len(blocked_cells):
+            xs, ys = np.unravel_index(blocked_cells, (self.width, self.height))
+            best = np.full((self.cells, len(blocked_cells)), UNREACHABLE, dtype=np.int64)
+            for dx, dy in ACTION_DELTAS:
+                nx = xs + dx
+                ny = ys + dy
+                inside = (nx >= 0) & (nx < self.width) & (ny >= 0) & (ny < self.height)
+                cols = np.flatnonzero(inside)
+                around = dist[:, nx[inside] * self.height + ny[inside]].astype(np.int64) + 1
+                best[:, cols] = np.minimum(best[:, cols], around)
+            best[np.arange(self.cells)[:, None] == blocked_cells[None, :]] = 0
+            dist[:, blocked_cells] = np.minimum(best, UNREACHABLE).astype(np.uint16)
+        return dist
+
+    def build_next_hop(self):
+        best = np.full((self.cells, self.cells), UNREACHABLE, dtype=np.int64)
+        next_hop = np.full((self.cells, self.cells), NO_ACTION, dtype=np.uint8)
+        for a in range(len(ACTION_DELTAS)):
+            valid = self.neighbors[:, a] >= 0
+            through = np.full((self.cells, self.cells), UNREACHABLE, dtype=np.int64)
+            through[valid] = self.dist[self.neighbors[valid, a]]
+            better = through < best
+            best[better] = through[better]
+            next_hop[better] = a
+        next_hop[np.arange(self.cells), np.arange(self.cells)] = 0
+        return next_hop
+
+    def distance(self, a, b):
+        d = self.dist[self.cell(*a), self.cell(*b)]
+        if d == UNREACHABLE:
+            return -1
+        return int(d)
+
+    def next_action(self, enemy_pos, player_pos):
+        action = self.next_hop[self.cell(*enemy_pos), self.cell(*player_pos)]
+        if action == NO_ACTION:
+            return None
+        return int(action)
+
+
+@lru_cache(maxsize=16)
+def cached_pathfinder(walls, width, height):
+    return PathFinder(walls, width, height)
+
+
+def get_pathfinder(walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+    return cached_pathfinder(wall_key(walls), width, height)
+
+
+def path_chase_action(enemy, player):
+    action = get_pathfinder(enemy.walls, enemy.width, enemy.height).next_action((enemy.grid_x, enemy.grid_y), (player.grid_x, player.grid_y))
+    if action is None:
+        return enemy.chase_player_action(player)
+    return action
@@ -1,58 +1,77 @@
+import argparse
 import random
+
+import numpy as np
 import pygame
 import torch
 
-from dqn_agent import EnemyDQN
-from game_core import Game, GRID_WIDTH, GRID_HEIGHT
-
-
-def build_state(game):
-    ex = game.enemy.grid_x
-    ey = game.enemy.grid_y
-    px = game.player.grid_x
-    py = game.player.grid_y
-    dx = (px - ex) / GRID_WIDTH
-    dy = (py - ey) / GRID_HEIGHT
-    dist = (abs(px - ex) + abs(py - ey)) / (GRID_WIDTH + GRID_HEIGHT)
-    up_block = 1.0 if ey - 1 < 0 or (ex, ey - 1) in game.walls else 0.0
-    down_block = 1.0 if ey + 1 >= GRID_HEIGHT or (ex, ey + 1) in game.walls else 0.0
-    left_block = 1.0 if ex - 1 < 0 or (ex - 1, ey) in game.walls else 0.0
-    right_block = 1.0 if ex + 1 >= GRID_WIDTH or (ex + 1, ey) in game.walls else 0.0
-    px_norm = px / GRID_WIDTH
-    py_norm = py / GRID_HEIGHT
-    ex_norm = ex / GRID_WIDTH
-    ey_norm = ey / GRID_HEIGHT
-    return [
-        dx,
-        dy,
-        dist,
-        up_block,
-        down_block,
-        left_block,
-        right_block,
-        px_norm,
-        py_norm,
-        ex_norm,
-        ey_norm,
-    ]
+from async_controller import AsyncEnemyController
+from dqn_agent import load_enemy_dqn, model_view_radius
+from features import featurizer_for, observation_dim, view_radius_for
+from game_core import Game
+from inference_server import InferenceServer
+from pathfinding import path_chase_action
+from profiler import add_profiler_arguments, profiler_from_args
+
+
+def build_state(game, out=None, view_radius=None):
+    featurizer = game.featurizer
+    if view_radius is not None:
+        featurizer = featurizer_for(game.walls, game.width, game.height, view_radius)
+    if out is None:
+        out = np.empty(featurizer.state_dim, dtype=np.float32)
+    return featurizer.write_state(out, game.enemy.grid_x, game.enemy.grid_y, game.player.grid_x, game.player.grid_y)
 
 
 def make_enemy_controller(model_path="enemy_dqn.pth"):
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    input_dim = 11
-    action_dim = 4
-    model = EnemyDQN(input_dim, action_dim).to(device)
-    state_dict = torch.load(model_path, map_location=device)
-    model.load_state_dict(state_dict)
-    model.eval()
+    model = load_enemy_dqn(model_path, device)
+    view_radius = model_view_radius(model)
+    state_tensor = torch.zeros(1, observation_dim(view_radius), dtype=torch.float32)
+    state_buffer = state_tensor.numpy()[0]
 
     def controller(game):
-        state = build_state(game)
-        s = torch.tensor(state, dtype=torch.float32, device=device).unsqueeze(0)
+        build_state(game, state_buffer, view_radius)
         with torch.no_grad():
-            q_values = model(s)
+            q_values = model(state_tensor.to(device))
             dqn_action = int(torch.argmax(q_values, dim=1).item())
-        rule_action = game.enemy.chase_player_action(game.player)
+        rule_action = path_chase_action(game.enemy, game.player)
+        if random.random() < 0.5:
+            return rule_action
+        return dqn_action
+
+    return controller
+
+
+def make_exported_enemy_controller(artifact_dir="exported"):
+    from model_export import artifact_input_dim, find_artifact, load_artifact
+
+    path = find_artifact(artifact_dir)
+    run = load_artifact(path)
+    view_radius = view_radius_for(artifact_input_dim(path))
+
+    def controller(game):
+        dqn_action = int(run(build_state(game, view_radius=view_radius)[None])[0].argmax())
+        rule_action = path_chase_action(game.enemy, game.player)
+        if random.random() < 0.5:
+            return rule_action
+        return dqn_action
+
+    return controller
+
+
+def make_inference_server(model_path="enemy_dqn.pth", max_batch=64, max_wait=0.002):
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_enemy_dqn(model_path, device)
+    return InferenceServer(model, device, max_batch=max_batch, max_wait=max_wait)
+
+
+def make_batched_enemy_controller(server):
+    view_radius = model_view_radius(server.model)
+
+    def controller(game):
+        dqn_action = server.act(build_state(game, view_radius=view_radius))
+        rule_action = path_chase_action(game.enemy, game.player)
         if random.random() < 0.5:
             return rule_action
         return dqn_action
@@ -61,7 +80,23 @@ def make_enemy_controller(model_path="enemy_dqn.pth"):
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model-path", default="enemy_dqn.pth")
+    parser.add_argument("--record-dir", default=None)
+    parser.add_argument("--decision-budget-ms", type=float, default=5.0)
+    parser.add_argument("--sync-controller", action="store_true")
+    add_profiler_arguments(parser)
+    args = parser.parse_args()
     pygame.init()
-    controller = make_enemy_controller()
-    game = Game(enemy_controller=controller)
+    controller = make_enemy_controller(args.model_path)
+    if not args.sync_controller:
+        controller = AsyncEnemyController(
+            controller,
+            budget=args.decision_budget_ms / 1000.0,
+            fallback=lambda game: path_chase_action(game.enemy, game.player),
+        )
+    game = Game(enemy_controller=controller, record_dir=args.record_dir, model_name=args.model_path)
+    profiler = profiler_from_args(args)
+    if profiler is not None:
+        game.profiler = profiler
     game.run()
@@ -0,0 +1,86 @@
+import argparse
+import random
+
+import numpy as np
+
+from features import featurizer_for
+from layouts import fixed_layout
+from pathfinding import path_chase_action
+from sim_core import GRID_WIDTH, GRID_HEIGHT
+
+
+def table_states(walls, start, end, view_radius=None):
+    return cell_pair_states(walls, np.arange(start, end), view_radius)
+
+
+def cell_pair_states(walls, flat, view_radius=None):
+    ex, ey, px, py = np.unravel_index(flat, (GRID_WIDTH, GRID_HEIGHT, GRID_WIDTH, GRID_HEIGHT))
+    return featurizer_for(walls, GRID_WIDTH, GRID_HEIGHT, view_radius).batch(ex, ey, px, py)
+
+
+def export_policy_table(
+    model_path="enemy_dqn.pth",
+    table_path="enemy_actions.npy",
+    q_path=None,
+    batch_size=65536,
+):
+    import torch
+
+    from dqn_agent import load_enemy_dqn, model_view_radius
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = load_enemy_dqn(model_path, device)
+    view_radius = model_view_radius(model)
+    walls = fixed_layout().walls
+    shape = (GRID_WIDTH, GRID_HEIGHT, GRID_WIDTH, GRID_HEIGHT)
+    actions = np.lib.format.open_memmap(table_path, mode="w+", dtype=np.uint8, shape=shape)
+    flat_actions = actions.reshape(-1)
+    flat_q = None
+    if q_path is not None:
+        q_table = np.lib.format.open_memmap(q_path, mode="w+", dtype=np.float16, shape=shape + (4,))
+        flat_q = q_table.reshape(-1, 4)
+    total = flat_actions.shape[0]
+    for start in range(0, total, batch_size):
+        end = min(start + batch_size, total)
+        states = torch.from_numpy(table_states(walls, start, end, view_radius)).to(device)
+        with torch.no_grad():
+            q_values = model(states)
+        flat_actions[start:end] = torch.argmax(q_values, dim=1).cpu().numpy()
+        if flat_q is not None:
+            flat_q[start:end] = q_values.cpu().numpy()
+    actions.flush()
+    if flat_q is not None:
+        q_table.flush()
+
+
+def load_policy_table(table_path="enemy_actions.npy"):
+    return np.load(table_path, mmap_mode="r")
+
+
+def make_table_enemy_controller(table_path="enemy_actions.npy"):
+    table = load_policy_table(table_path)
+
+    def controller(game):
+        dqn_action = int(table[game.enemy.grid_x, game.enemy.grid_y, game.player.grid_x, game.player.grid_y])
+        rule_action = path_chase_action(game.enemy, game.player)
+        if random.random() < 0.5:
+            return rule_action
+        return dqn_action
+
+    return controller
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["export", "play"])
+    parser.add_argument("--model-path", default="enemy_dqn.pth")
+    parser.add_argument("--table-path", default="enemy_actions.npy")
+    parser.add_argument("--q-path", default=None)
+    args = parser.parse_args()
+    if args.command == "export":
+        export_policy_table(args.model_path, args.table_path, args.q_path)
+    else:
+        from game_core import Game
+
+        game = Game(enemy_controller=make_table_enemy_controller(args.table_path))
+        game.run()
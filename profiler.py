@@ -0,0 +1,209 @@
+import collections
+import contextlib
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+
+HISTOGRAM_BUCKETS = 32
+NULL_PHASE = contextlib.nullcontext()
+
+
+class PhaseStats:
+    def __init__(self, window=1000):
+        self.durations = collections.deque(maxlen=window)
+        self.histogram = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, duration):
+        self.durations.append(duration)
+        self.histogram[min(int(duration * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += duration
+
+    def summary(self):
+        recent = sorted(self.durations)
+        if not recent:
+            return {"count": 0, "total_s": 0.0}
+        return {
+            "count": self.count,
+            "total_s": self.total,
+            "mean_ms": self.total / self.count * 1000.0,
+            "p50_ms": recent[len(recent) // 2] * 1000.0,
+            "p99_ms": recent[min(len(recent) - 1, int(len(recent) * 0.99))] * 1000.0,
+            "histogram_us_log2": list(self.histogram),
+        }
+
+
+class Phase:
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+
+
+class Profiler:
+    def __init__(self, enabled=True, window=1000, out_path=None, trace_path=None, max_events=200000, sample_interval=None):
+        self.enabled = enabled
+        self.window = window
+        self.out_path = out_path
+        self.trace_path = trace_path
+        self.phases = {}
+        self.events = collections.deque(maxlen=max_events) if trace_path is not None else None
+        self.allocations = collections.deque(maxlen=window)
+        self.last_blocks = sys.getallocatedblocks()
+        self.origin = time.perf_counter()
+        self.sampler = SamplingProfiler(sample_interval) if enabled and sample_interval else None
+        if self.sampler is not None:
+            self.sampler.start()
+
+    def phase(self, name):
+        if not self.enabled:
+            return NULL_PHASE
+        return Phase(self, name)
+
+    def record(self, name, start, end):
+        stats = self.phases.get(name)
+        if stats is None:
+            stats = self.phases[name] = PhaseStats(self.window)
+        stats.add(end - start)
+        if self.events is not None:
+            self.events.append((name, start, end))
+
+    def step(self):
+        if not self.enabled:
+            return
+        blocks = sys.getallocatedblocks()
+        self.allocations.append(blocks - self.last_blocks)
+        self.last_blocks = blocks
+
+    def summary(self):
+        result = {name: stats.summary() for name, stats in self.phases.items()}
+        if self.allocations:
+            result["allocated_blocks_per_step"] = {
+                "mean": sum(self.allocations) / len(self.allocations),
+                "max": max(self.allocations),
+            }
+        return result
+
+    def report(self):
+        lines = []
+        total = sum(stats.total for stats in self.phases.values()) or 1.0
+        for name, stats in sorted(self.phases.items(), key=lambda item: -item[1].total):
+            s = stats.summary()
+            if stats.count:
+                lines.append(
+                    f"  {name}: {s['mean_ms']:.3f} ms mean, p50 {s['p50_ms']:.3f}, p99 {s['p99_ms']:.3f}, "
+                    f"{stats.total / total:.1%} of timed"
+                )
+        if self.allocations:
+            lines.append(f"  allocated blocks/step: {sum(self.allocations) / len(self.allocations):.1f} mean")
+        return "\n".join(lines)
+
+    def export_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_csv(self, path):
+        fields = ["phase", "count", "total_s", "mean_ms", "p50_ms", "p99_ms"]
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(fields)
+            for name, stats in self.phases.items():
+                s = stats.summary()
+                writer.writerow([name] + [s.get(field, "") for field in fields[1:]])
+
+    def export_chrome_trace(self, path):
+        events = [
+            {
+                "name": name,
+                "ph": "X",
+                "ts": (start - self.origin) * 1e6,
+                "dur": (end - start) * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+            }
+            for name, start, end in self.events or ()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events}, f)
+
+    def export(self, path):
+        if path.endswith(".csv"):
+            self.export_csv(path)
+        else:
+            self.export_json(path)
+
+    def finish(self):
+        if not self.enabled:
+            return
+        if self.sampler is not None:
+            self.sampler.stop()
+            print(self.sampler.report())
+        if self.out_path is not None:
+            self.export(self.out_path)
+        if self.trace_path is not None:
+            self.export_chrome_trace(self.trace_path)
+
+
+NULL_PROFILER = Profiler(enabled=False)
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.counts = collections.Counter()
+        self.samples = 0
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.running.set()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while self.running.is_set():
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[f"{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}:{frame.f_lineno}"] += 1
+                self.samples += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.running.clear()
+        if self.thread is not None:
+            self.thread.join()
+
+    def report(self, top=20):
+        lines = [f"sampling profile ({self.samples} samples):"]
+        for location, count in self.counts.most_common(top):
+            lines.append(f"  {count / max(1, self.samples):6.1%}  {location}")
+        return "\n".join(lines)
+
+
+def add_profiler_arguments(parser):
+    parser.add_argument("--profile", default=None)
+    parser.add_argument("--profile-trace", default=None)
+    parser.add_argument("--sample-profile", action="store_true")
+
+
+def profiler_from_args(args):
+    if not (args.profile or args.profile_trace or args.sample_profile):
+        return None
+    return Profiler(
+        out_path=args.profile,
+        trace_path=args.profile_trace,
+        sample_interval=0.005 if args.sample_profile else None,
+    )
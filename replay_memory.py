@@ -0,0 +1,193 @@
+import os
+from collections import deque
+
+import numpy as np
+import torch
+
+
+REPLAY_FIELDS = ("states", "actions", "rewards", "next_states", "dones")
+
+
+class ReplayMemory:
+    def __init__(self, capacity, state_dim=11):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros((capacity, state_dim), dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.bool_)
+        self.tensors = [torch.from_numpy(a) for a in self.arrays()]
+        self.position = 0
+        self.size = 0
+
+    def arrays(self):
+        return self.states, self.actions, self.rewards, self.next_states, self.dones
+
+    def push(self, transition):
+        state, action, reward, next_state, done = transition
+        i = self.position
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def sample(self, batch_size):
+        idx = torch.randint(0, self.size, (batch_size,))
+        return tuple(t[idx] for t in self.tensors)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, array in zip(REPLAY_FIELDS, self.arrays()):
+            np.save(os.path.join(path, name + ".npy"), array)
+        np.save(os.path.join(path, "meta.npy"), np.array([self.position, self.size], dtype=np.int64))
+
+    def load(self, path):
+        position, size = np.load(os.path.join(path, "meta.npy"))
+        saved = [np.load(os.path.join(path, name + ".npy"), mmap_mode="r") for name in REPLAY_FIELDS]
+        saved_capacity = len(saved[1])
+        count = min(int(size), self.capacity)
+        order = (int(position) - count + np.arange(count)) % saved_capacity
+        for array, saved_array in zip(self.arrays(), saved):
+            array[:count] = saved_array[order]
+        self.position = count % self.capacity
+        self.size = count
+
+    def state_dict(self):
+        return {
+            "arrays": [array.copy() for array in self.arrays()],
+            "position": self.position,
+            "size": self.size,
+        }
+
+    def load_state_dict(self, state):
+        for array, saved in zip(self.arrays(), state["arrays"]):
+            array[:] = saved
+        self.position = state["position"]
+        self.size = state["size"]
+
+    def __len__(self):
+        return self.size
+
+
+class SumTree:
+    def __init__(self, capacity):
+        self.leaf_count = 1
+        while self.leaf_count < capacity:
+            self.leaf_count *= 2
+        self.depth = self.leaf_count.bit_length() - 1
+        self.tree = np.zeros(2 * self.leaf_count, dtype=np.float64)
+
+    def total(self):
+        return self.tree[1]
+
+    def update(self, indices, priorities):
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaf_count
+        self.tree[nodes] = priorities
+        for _ in range(self.depth):
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def find(self, values):
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for _ in range(self.depth):
+            left = 2 * nodes
+            left_sum = self.tree[left]
+            go_right = values > left_sum
+            values = np.where(go_right, values - left_sum, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaf_count
+
+    def get(self, indices):
+        return self.tree[np.asarray(indices, dtype=np.int64) + self.leaf_count]
+
+
+class PrioritizedReplayMemory(ReplayMemory):
+    def __init__(self, capacity, state_dim=11, alpha=0.6, beta_start=0.4, beta_steps=100000, eps=1e-5):
+        super().__init__(capacity, state_dim)
+        self.tree = SumTree(capacity)
+        self.alpha = alpha
+        self.beta_start = beta_start
+        self.beta_steps = beta_steps
+        self.eps = eps
+        self.max_priority = 1.0
+        self.sample_count = 0
+        self.indices = None
+        self.weights = None
+
+    def beta(self):
+        fraction = min(1.0, self.sample_count / self.beta_steps)
+        return self.beta_start + fraction * (1.0 - self.beta_start)
+
+    def push(self, transition):
+        i = self.position
+        super().push(transition)
+        self.tree.update([i], self.max_priority ** self.alpha)
+
+    def sample(self, batch_size):
+        segment = self.tree.total() / batch_size
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+        probs = self.tree.get(indices) / self.tree.total()
+        weights = (self.size * probs) ** (-self.beta())
+        weights /= weights.max()
+        self.sample_count += 1
+        self.indices = indices
+        self.weights = torch.from_numpy(weights.astype(np.float32))
+        idx = torch.from_numpy(indices)
+        return tuple(t[idx] for t in self.tensors)
+
+    def update_priorities(self, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(self.indices, priorities ** self.alpha)
+
+    def state_dict(self):
+        state = super().state_dict()
+        state["tree"] = self.tree.tree.copy()
+        state["max_priority"] = self.max_priority
+        state["sample_count"] = self.sample_count
+        return state
+
+    def load_state_dict(self, state):
+        super().load_state_dict(state)
+        self.tree.tree[:] = state["tree"]
+        self.max_priority = state["max_priority"]
+        self.sample_count = state["sample_count"]
+
+    def load(self, path):
+        super().load(path)
+        self.tree.update(np.arange(self.size), self.max_priority ** self.alpha)
+
+
+class NStepWriter:
+    def __init__(self, memory, n_step, gamma):
+        self.memory = memory
+        self.n_step = n_step
+        self.gamma = gamma
+        self.pending = deque()
+
+    def push(self, transition):
+        state, action, reward, next_state, done = transition
+        self.pending.append((np.array(state, dtype=np.float32), action, reward))
+        if done:
+            while self.pending:
+                self.emit(next_state, True)
+        elif len(self.pending) == self.n_step:
+            self.emit(next_state, False)
+
+    def emit(self, next_state, done):
+        state, action, _ = self.pending[0]
+        ret = 0.0
+        for i, (_, _, reward) in enumerate(self.pending):
+            ret += self.gamma**i * reward
+        self.memory.push((state, action, ret, next_state, done))
+        self.pending.popleft()
+
+    def clear(self):
+        self.pending.clear()
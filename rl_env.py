@@ -1,20 +1,68 @@
-import math
 import random
 
-from game_core import GRID_WIDTH, GRID_HEIGHT, generate_walls, Player, Enemy
+import numpy as np
+
+from layouts import fixed_layout, get_layout, spawn_cells, start_cells
+from pathfinding import UNREACHABLE
+from sim_core import GRID_WIDTH, GRID_HEIGHT, ACTION_DELTAS, Player, Enemy
+from wall_bits import WallBits
+
+
+def chase_reward(dist_before, dist_after, caught):
+    reward = 0.0
+    if dist_after < dist_before:
+        reward += 0.1
+    else:
+        reward -= 0.1
+    if dist_after <= 3:
+        reward += 0.05
+    reward -= 0.01
+    if caught:
+        reward += 10.0
+    return reward
+
+
+def chase_rewards(dist_before, dist_after, caught):
+    rewards = np.where(dist_after < dist_before, 0.1, -0.1)
+    rewards = np.where(dist_after <= 3, rewards + 0.05, rewards)
+    rewards -= 0.01
+    return np.where(caught, rewards + 10.0, rewards)
+
+
+def choose_layout(layout_seeds, width, height):
+    if layout_seeds:
+        return get_layout(random.choice(layout_seeds), width, height)
+    return fixed_layout(width, height)
+
+
+def layout_featurizer(layout, view_radius=None):
+    if view_radius is None:
+        return layout.featurizer
+    return layout.egocentric_featurizer(view_radius)
 
 
 class RLEnvironment:
-    def __init__(self, max_steps=400):
+    def __init__(
+        self, max_steps=400, geodesic=False, layout_seeds=None, width=GRID_WIDTH, height=GRID_HEIGHT, view_radius=None
+    ):
         self.max_steps = max_steps
+        self.geodesic = geodesic
+        self.layout_seeds = list(layout_seeds) if layout_seeds is not None else None
+        self.width = width
+        self.height = height
+        self.view_radius = view_radius
         self.reset()
 
     def reset(self):
-        self.walls = generate_walls()
-        self.player = Player(3, GRID_HEIGHT // 2)
-        self.enemy = Enemy(GRID_WIDTH - 4, GRID_HEIGHT // 2)
+        self.layout = choose_layout(self.layout_seeds, self.width, self.height)
+        self.walls = self.layout.walls
+        (px, py), (ex, ey) = start_cells(self.width, self.height)
+        self.player = Player(px, py, self.width, self.height)
+        self.enemy = Enemy(ex, ey, self.width, self.height)
         self.player.walls = self.walls
         self.enemy.walls = self.walls
+        self.featurizer = layout_featurizer(self.layout, self.view_radius)
+        self.pathfinder = self.layout.pathfinder if self.geodesic else None
         self.steps = 0
         self.done = False
         return self.get_state()
@@ -40,65 +88,235 @@ class RLEnvironment:
             dx, dy = direction
         self.player.move(dx, dy)
 
-    def get_state(self):
-        ex = self.enemy.grid_x
-        ey = self.enemy.grid_y
-        px = self.player.grid_x
-        py = self.player.grid_y
-        dx = (px - ex) / GRID_WIDTH
-        dy = (py - ey) / GRID_HEIGHT
-        dist = (abs(px - ex) + abs(py - ey)) / (GRID_WIDTH + GRID_HEIGHT)
-        up_block = 1.0 if ey - 1 < 0 or (ex, ey - 1) in self.walls else 0.0
-        down_block = 1.0 if ey + 1 >= GRID_HEIGHT or (ex, ey + 1) in self.walls else 0.0
-        left_block = 1.0 if ex - 1 < 0 or (ex - 1, ey) in self.walls else 0.0
-        right_block = 1.0 if ex + 1 >= GRID_WIDTH or (ex + 1, ey) in self.walls else 0.0
-        px_norm = px / GRID_WIDTH
-        py_norm = py / GRID_HEIGHT
-        ex_norm = ex / GRID_WIDTH
-        ey_norm = ey / GRID_HEIGHT
-        state = [
-            dx,
-            dy,
-            dist,
-            up_block,
-            down_block,
-            left_block,
-            right_block,
-            px_norm,
-            py_norm,
-            ex_norm,
-            ey_norm,
-        ]
-        return state
-
-    def step(self, action):
+    def get_state(self, out=None):
+        if out is None:
+            out = np.empty(self.featurizer.state_dim, dtype=np.float32)
+        return self.featurizer.write_state(out, self.enemy.grid_x, self.enemy.grid_y, self.player.grid_x, self.player.grid_y)
+
+    def step(self, action, out=None):
         if self.done:
-            return self.get_state(), 0.0, True
+            return self.get_state(out), 0.0, True
         self.steps += 1
-        ex = self.enemy.grid_x
-        ey = self.enemy.grid_y
-        px = self.player.grid_x
-        py = self.player.grid_y
-        dist_before = abs(px - ex) + abs(py - ey)
+        dist_before = self.distance()
         self.enemy.step(action)
         self.scripted_player_step()
         ex = self.enemy.grid_x
         ey = self.enemy.grid_y
         px = self.player.grid_x
         py = self.player.grid_y
-        dist_after = abs(px - ex) + abs(py - ey)
-        reward = 0.0
-        if dist_after < dist_before:
-            reward += 0.1
-        else:
-            reward -= 0.1
-        if dist_after <= 3:
-            reward += 0.05
-        reward -= 0.01
+        dist_after = self.distance()
+        reward = chase_reward(dist_before, dist_after, ex == px and ey == py)
         if ex == px and ey == py:
-            reward += 10.0
             self.done = True
         if self.steps >= self.max_steps and not self.done:
             reward -= 5.0
             self.done = True
-        return self.get_state(), reward, self.done
+        return self.get_state(out), reward, self.done
+
+    def distance(self):
+        if self.pathfinder is not None:
+            d = self.pathfinder.distance((self.enemy.grid_x, self.enemy.grid_y), (self.player.grid_x, self.player.grid_y))
+            if d >= 0:
+                return d
+        return abs(self.player.grid_x - self.enemy.grid_x) + abs(self.player.grid_y - self.enemy.grid_y)
+
+
+PLAYER_MOVES = [(1, 0), (-1, 0), (0, 1), (0, -1), (0, 0)]
+
+
+def wall_grid(walls, width=GRID_WIDTH, height=GRID_HEIGHT):
+    if not isinstance(walls, WallBits):
+        walls = WallBits.from_cells(walls, width, height)
+    return walls.padded()
+
+
+class VecRLEnvironment:
+    def __init__(
+        self,
+        num_envs,
+        max_steps=400,
+        rngs=None,
+        geodesic=False,
+        layout_seed=None,
+        width=GRID_WIDTH,
+        height=GRID_HEIGHT,
+        view_radius=None,
+    ):
+        self.num_envs = num_envs
+        self.max_steps = max_steps
+        self.geodesic = geodesic
+        if rngs is None:
+            rngs = [random] * num_envs
+        self.rngs = rngs
+        self.layout = get_layout(layout_seed, width, height) if layout_seed is not None else fixed_layout(width, height)
+        self.walls = self.layout.walls
+        self.blocked = self.walls.padded()
+        self.featurizer = layout_featurizer(self.layout, view_radius)
+        self.starts = start_cells(width, height)
+        self.pathfinder = self.layout.pathfinder if geodesic else None
+        self.action_dx = np.array([d[0] for d in ACTION_DELTAS], dtype=np.int64)
+        self.action_dy = np.array([d[1] for d in ACTION_DELTAS], dtype=np.int64)
+        self.enemy_x = np.zeros(num_envs, dtype=np.int64)
+        self.enemy_y = np.zeros(num_envs, dtype=np.int64)
+        self.player_x = np.zeros(num_envs, dtype=np.int64)
+        self.player_y = np.zeros(num_envs, dtype=np.int64)
+        self.steps = np.zeros(num_envs, dtype=np.int64)
+        self.done = np.zeros(num_envs, dtype=bool)
+        self.reset()
+
+    def reset(self):
+        self.reset_envs(np.ones(self.num_envs, dtype=bool))
+        return self.get_state()
+
+    def reset_envs(self, mask):
+        (px, py), (ex, ey) = self.starts
+        self.player_x[mask] = px
+        self.player_y[mask] = py
+        self.enemy_x[mask] = ex
+        self.enemy_y[mask] = ey
+        self.steps[mask] = 0
+        self.done[mask] = False
+
+    def move(self, x, y, dx, dy):
+        new_x = x + dx
+        new_y = y + dy
+        free = ~self.blocked[new_x + 1, new_y + 1]
+        return np.where(free, new_x, x), np.where(free, new_y, y)
+
+    def scripted_player_deltas(self):
+        diff_x = self.enemy_x - self.player_x
+        diff_y = self.enemy_y - self.player_y
+        greedy_dx = np.where(np.abs(diff_x) > np.abs(diff_y), -np.sign(diff_x), 0)
+        greedy_dy = np.where(np.abs(diff_x) > np.abs(diff_y), 0, -np.sign(diff_y))
+        dx = np.zeros(self.num_envs, dtype=np.int64)
+        dy = np.zeros(self.num_envs, dtype=np.int64)
+        for i, rng in enumerate(self.rngs):
+            if rng.random() < 0.6:
+                dx[i] = greedy_dx[i]
+                dy[i] = greedy_dy[i]
+            else:
+                dx[i], dy[i] = rng.choice(PLAYER_MOVES)
+        return dx, dy
+
+    def get_state(self, out=None):
+        if out is None:
+            out = np.empty((self.num_envs, self.featurizer.state_dim), dtype=np.float32)
+        return self.featurizer.write_batch(out, self.enemy_x, self.enemy_y, self.player_x, self.player_y)
+
+    def distance(self):
+        manhattan = np.abs(self.player_x - self.enemy_x) + np.abs(self.player_y - self.enemy_y)
+        if self.pathfinder is None:
+            return manhattan
+        pf = self.pathfinder
+        d = pf.dist[pf.cell(self.enemy_x, self.enemy_y), pf.cell(self.player_x, self.player_y)].astype(np.int64)
+        return np.where(d == UNREACHABLE, manhattan, d)
+
+    def step(self, actions):
+        actions = np.asarray(actions, dtype=np.int64)
+        self.steps += 1
+        dist_before = self.distance()
+        self.enemy_x, self.enemy_y = self.move(
+            self.enemy_x, self.enemy_y, self.action_dx[actions], self.action_dy[actions]
+        )
+        dx, dy = self.scripted_player_deltas()
+        self.player_x, self.player_y = self.move(self.player_x, self.player_y, dx, dy)
+        dist_after = self.distance()
+        caught = (self.enemy_x == self.player_x) & (self.enemy_y == self.player_y)
+        rewards = chase_rewards(dist_before, dist_after, caught)
+        timeout = (self.steps >= self.max_steps) & ~caught
+        rewards = np.where(timeout, rewards - 5.0, rewards)
+        self.done = caught | timeout
+        states = self.get_state()
+        dones = self.done.copy()
+        if dones.any():
+            self.reset_envs(dones)
+        return states, rewards, dones
+
+
+class MultiEnemyRLEnvironment:
+    def __init__(
+        self,
+        num_enemies,
+        max_steps=400,
+        layout_seeds=None,
+        min_spawn_distance=8,
+        width=GRID_WIDTH,
+        height=GRID_HEIGHT,
+        view_radius=None,
+    ):
+        self.num_enemies = num_enemies
+        self.max_steps = max_steps
+        self.min_spawn_distance = min_spawn_distance
+        self.layout_seeds = list(layout_seeds) if layout_seeds is not None else None
+        self.width = width
+        self.height = height
+        self.view_radius = view_radius
+        self.action_dx = np.array([d[0] for d in ACTION_DELTAS], dtype=np.int64)
+        self.action_dy = np.array([d[1] for d in ACTION_DELTAS], dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.layout = choose_layout(self.layout_seeds, self.width, self.height)
+        self.walls = self.layout.walls
+        self.blocked = self.walls.padded()
+        self.featurizer = layout_featurizer(self.layout, self.view_radius)
+        px, py = start_cells(self.width, self.height)[0]
+        self.player = Player(px, py, self.width, self.height)
+        self.player.walls = self.walls
+        cells = spawn_cells(
+            self.walls,
+            (px, py),
+            self.num_enemies,
+            self.min_spawn_distance,
+            width=self.width,
+            height=self.height,
+        )
+        self.enemy_x = np.array([x for x, _ in cells], dtype=np.int64)
+        self.enemy_y = np.array([y for _, y in cells], dtype=np.int64)
+        self.steps = 0
+        self.done = False
+        return self.get_state()
+
+    def get_state(self, out=None):
+        if out is None:
+            out = np.empty((self.num_enemies, self.featurizer.state_dim), dtype=np.float32)
+        return self.featurizer.write_batch(out, self.enemy_x, self.enemy_y, self.player.grid_x, self.player.grid_y)
+
+    def distances(self):
+        return np.abs(self.player.grid_x - self.enemy_x) + np.abs(self.player.grid_y - self.enemy_y)
+
+    def scripted_player_step(self):
+        nearest = int(np.argmin(self.distances()))
+        diff_x = int(self.enemy_x[nearest]) - self.player.grid_x
+        diff_y = int(self.enemy_y[nearest]) - self.player.grid_y
+        dx = 0
+        dy = 0
+        if random.random() < 0.6:
+            if abs(diff_x) > abs(diff_y):
+                dx = -1 if diff_x > 0 else 1
+            elif diff_y != 0:
+                dy = -1 if diff_y > 0 else 1
+        else:
+            dx, dy = random.choice(PLAYER_MOVES)
+        self.player.move(dx, dy)
+
+    def step(self, actions, out=None):
+        if self.done:
+            return self.get_state(out), np.zeros(self.num_enemies), True
+        actions = np.asarray(actions, dtype=np.int64)
+        self.steps += 1
+        dist_before = self.distances()
+        new_x = self.enemy_x + self.action_dx[actions]
+        new_y = self.enemy_y + self.action_dy[actions]
+        free = ~self.blocked[new_x + 1, new_y + 1]
+        self.enemy_x = np.where(free, new_x, self.enemy_x)
+        self.enemy_y = np.where(free, new_y, self.enemy_y)
+        self.scripted_player_step()
+        dist_after = self.distances()
+        caught = (self.enemy_x == self.player.grid_x) & (self.enemy_y == self.player.grid_y)
+        rewards = chase_rewards(dist_before, dist_after, caught)
+        self.done = bool(caught.any())
+        if self.steps >= self.max_steps and not self.done:
+            rewards -= 5.0
+            self.done = True
+        return self.get_state(out), rewards, self.done
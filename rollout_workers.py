@@ -0,0 +1,304 @@
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+
+import numpy as np
+import torch
+import torch.optim as optim
+
+from dqn_agent import build_enemy_dqn, optimize_model, soft_update
+from features import observation_dim
+from replay_memory import NStepWriter
+from rl_env import RLEnvironment
+from sim_core import GRID_WIDTH, GRID_HEIGHT
+
+
+ACTION_DIM = 4
+
+
+class SharedReplayBuffer:
+    def __init__(self, capacity, state_dim, ctx):
+        self.capacity = capacity
+        self.state_dim = state_dim
+        self.lock = ctx.Lock()
+        self.position = ctx.RawValue("q", 0)
+        self.size = ctx.RawValue("q", 0)
+        self.raw_states = ctx.RawArray("f", capacity * state_dim)
+        self.raw_actions = ctx.RawArray("q", capacity)
+        self.raw_rewards = ctx.RawArray("f", capacity)
+        self.raw_next_states = ctx.RawArray("f", capacity * state_dim)
+        self.raw_dones = ctx.RawArray("b", capacity)
+        self.attach()
+
+    def attach(self):
+        self.states = np.frombuffer(self.raw_states, dtype=np.float32).reshape(self.capacity, self.state_dim)
+        self.actions = np.frombuffer(self.raw_actions, dtype=np.int64)
+        self.rewards = np.frombuffer(self.raw_rewards, dtype=np.float32)
+        self.next_states = np.frombuffer(self.raw_next_states, dtype=np.float32).reshape(self.capacity, self.state_dim)
+        self.dones = np.frombuffer(self.raw_dones, dtype=np.bool_)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in ("states", "actions", "rewards", "next_states", "dones"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attach()
+
+    def push(self, transition):
+        state, action, reward, next_state, done = transition
+        with self.lock:
+            i = self.position.value
+            self.states[i] = state
+            self.actions[i] = action
+            self.rewards[i] = reward
+            self.next_states[i] = next_state
+            self.dones[i] = done
+            self.position.value = (i + 1) % self.capacity
+            if self.size.value < self.capacity:
+                self.size.value += 1
+
+    def sample(self, batch_size):
+        with self.lock:
+            idx = np.random.randint(0, self.size.value, size=batch_size)
+            return (
+                self.states[idx],
+                self.actions[idx],
+                self.rewards[idx],
+                self.next_states[idx],
+                self.dones[idx],
+            )
+
+    def __len__(self):
+        return self.size.value
+
+
+class SharedWeights:
+    def __init__(self, model, ctx):
+        numel = sum(p.numel() for p in model.parameters())
+        self.lock = ctx.Lock()
+        self.version = ctx.RawValue("q", 0)
+        self.raw = ctx.RawArray("f", numel)
+
+    def publish(self, model):
+        flat = torch.nn.utils.parameters_to_vector(model.parameters()).detach().cpu().numpy()
+        with self.lock:
+            np.frombuffer(self.raw, dtype=np.float32)[:] = flat
+            self.version.value += 1
+
+    def sync(self, model, known_version):
+        if self.version.value == known_version:
+            return known_version
+        with self.lock:
+            flat = torch.from_numpy(np.frombuffer(self.raw, dtype=np.float32).copy())
+            version = self.version.value
+        torch.nn.utils.vector_to_parameters(flat, model.parameters())
+        return version
+
+
+def worker_epsilon_end(worker_id, num_workers, epsilon_end):
+    return epsilon_end ** (1 + worker_id / max(1, num_workers - 1))
+
+
+def rollout_worker(
+    worker_id,
+    buffer,
+    weights,
+    results,
+    episodes,
+    max_steps,
+    epsilon_start,
+    epsilon_end,
+    epsilon_decay,
+    seed,
+    layout_seeds=None,
+    dueling=False,
+    n_step=1,
+    gamma=0.99,
+    width=GRID_WIDTH,
+    height=GRID_HEIGHT,
+    view_radius=None,
+):
+    torch.set_num_threads(1)
+    random.seed(seed)
+    env = RLEnvironment(
+        max_steps=max_steps, layout_seeds=layout_seeds, width=width, height=height, view_radius=view_radius
+    )
+    state_dim = observation_dim(view_radius)
+    model = build_enemy_dqn(state_dim, ACTION_DIM, dueling)
+    model.eval()
+    version = weights.sync(model, -1)
+    epsilon = epsilon_start
+    transitions = NStepWriter(buffer, n_step, gamma) if n_step > 1 else buffer
+    state_tensors = [torch.zeros(1, state_dim, dtype=torch.float32) for _ in range(2)]
+    state_buffers = [t.numpy()[0] for t in state_tensors]
+
+    for _ in range(episodes):
+        env.reset()
+        current = 0
+        state = env.get_state(state_buffers[current])
+        done = False
+        total_reward = 0.0
+        step_count = 0
+        while not done and step_count < max_steps:
+            step_count += 1
+            version = weights.sync(model, version)
+            if random.random() < epsilon:
+                action = random.randint(0, ACTION_DIM - 1)
+            else:
+                with torch.no_grad():
+                    action = int(torch.argmax(model(state_tensors[current]), dim=1).item())
+            next_state, reward, done = env.step(action, state_buffers[1 - current])
+            total_reward += reward
+            transitions.push((state, action, reward, next_state, done))
+            current = 1 - current
+            state = next_state
+
+        if epsilon > epsilon_end:
+            epsilon *= epsilon_decay
+            if epsilon < epsilon_end:
+                epsilon = epsilon_end
+        results.put((worker_id, total_reward, epsilon))
+
+    results.put((worker_id, None, None))
+
+
+def failed_worker(workers, stopped):
+    for worker_id, process in enumerate(workers):
+        if process.exitcode is not None and (process.exitcode != 0 or worker_id not in stopped):
+            return worker_id
+    return None
+
+
+def train_dqn_parallel(
+    episodes=1500,
+    max_steps=400,
+    gamma=0.99,
+    lr=1e-3,
+    batch_size=64,
+    memory_capacity=50000,
+    epsilon_start=1.0,
+    epsilon_end=0.05,
+    epsilon_decay=0.997,
+    target_update_interval=10,
+    model_path="enemy_dqn.pth",
+    num_workers=4,
+    weight_sync_interval=100,
+    layout_seeds=None,
+    double=False,
+    dueling=False,
+    n_step=1,
+    tau=None,
+    width=GRID_WIDTH,
+    height=GRID_HEIGHT,
+    view_radius=None,
+):
+    ctx = mp.get_context("spawn")
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - num_workers))
+    state_dim = observation_dim(view_radius)
+    policy_net = build_enemy_dqn(state_dim, ACTION_DIM, dueling).to(device)
+    target_net = build_enemy_dqn(state_dim, ACTION_DIM, dueling).to(device)
+    target_net.load_state_dict(policy_net.state_dict())
+    target_net.eval()
+    optimizer = optim.Adam(policy_net.parameters(), lr=lr)
+
+    buffer = SharedReplayBuffer(memory_capacity, state_dim, ctx)
+    weights = SharedWeights(policy_net, ctx)
+    weights.publish(policy_net)
+    results = ctx.Queue()
+
+    workers = []
+    base_seed = random.randrange(2**31)
+    for worker_id in range(num_workers):
+        worker_episodes = episodes // num_workers + (1 if worker_id < episodes % num_workers else 0)
+        process = ctx.Process(
+            target=rollout_worker,
+            args=(
+                worker_id,
+                buffer,
+                weights,
+                results,
+                worker_episodes,
+                max_steps,
+                epsilon_start,
+                worker_epsilon_end(worker_id, num_workers, epsilon_end),
+                epsilon_decay,
+                base_seed + worker_id,
+                list(layout_seeds) if layout_seeds is not None else None,
+                dueling,
+                n_step,
+                gamma,
+                width,
+                height,
+                view_radius,
+            ),
+            daemon=True,
+        )
+        process.start()
+        workers.append(process)
+
+    reward_history = []
+    epsilons = [epsilon_start] * num_workers
+    stopped = set()
+    optimizer_steps = 0
+
+    def handle(message):
+        worker_id, total_reward, epsilon = message
+        if total_reward is None:
+            stopped.add(worker_id)
+            return
+        epsilons[worker_id] = epsilon
+        reward_history.append(total_reward)
+        if tau is None and len(reward_history) % target_update_interval == 0:
+            target_net.load_state_dict(policy_net.state_dict())
+        if len(reward_history) % 50 == 0:
+            recent = reward_history[-50:]
+            avg_r = sum(recent) / len(recent)
+            mean_eps = sum(epsilons) / len(epsilons)
+            print(f"Episode {len(reward_history)}, avg reward {avg_r:.2f}, epsilon {mean_eps:.3f}")
+
+    try:
+        while len(stopped) < num_workers:
+            while True:
+                try:
+                    handle(results.get_nowait())
+                except queue.Empty:
+                    break
+            failed = failed_worker(workers, stopped)
+            if failed is not None and workers[failed].exitcode == 0:
+                while True:
+                    try:
+                        handle(results.get(timeout=1.0))
+                    except queue.Empty:
+                        break
+                failed = failed_worker(workers, stopped)
+            if failed is not None:
+                for process in workers:
+                    if process.is_alive():
+                        process.terminate()
+                raise RuntimeError(
+                    f"rollout worker {failed} exited with code {workers[failed].exitcode} before finishing its episodes"
+                )
+
+            if len(buffer) < batch_size:
+                time.sleep(0.001)
+                continue
+            optimize_model(policy_net, target_net, optimizer, buffer.sample(batch_size), gamma**n_step, device, double=double)
+            if tau is not None:
+                soft_update(target_net, policy_net, tau)
+            optimizer_steps += 1
+            if optimizer_steps % weight_sync_interval == 0:
+                weights.publish(policy_net)
+    finally:
+        for process in workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    torch.save(policy_net.state_dict(), model_path)
+    return reward_history
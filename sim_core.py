@@ -0,0 +1,264 @@
+import numpy as np
+
+from bullet_pool import OWNER_PLAYER, BulletPool
+from features import get_featurizer
+from grid import GRID_WIDTH, GRID_HEIGHT
+from profiler import NULL_PROFILER
+from wall_bits import WallBits
+
+
+INPUT_LEFT = 1
+INPUT_RIGHT = 2
+INPUT_UP = 4
+INPUT_DOWN = 8
+INPUT_AIM_LEFT = 16
+INPUT_AIM_RIGHT = 32
+INPUT_AIM_UP = 64
+INPUT_AIM_DOWN = 128
+INPUT_SHOOT = 256
+
+ACTION_DELTAS = [(0, -1), (0, 1), (-1, 0), (1, 0)]
+
+
+def generate_walls(width=GRID_WIDTH, height=GRID_HEIGHT):
+    solid = np.zeros((width, height), dtype=bool)
+    y_mid = height // 2
+    solid[3:width // 2 - 3, y_mid] = True
+    solid[width // 2 + 4:width - 3, y_mid] = True
+    for x in (3, width - 4):
+        solid[x, 3:y_mid - 2] = True
+        solid[x, y_mid + 3:height - 3] = True
+    return WallBits.from_dense(solid)
+
+
+class Player:
+    def __init__(self, grid_x, grid_y, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.width = width
+        self.height = height
+        self.dir_x = 0
+        self.dir_y = -1
+        self.speed = 1
+        self.walls = set()
+        self.max_hp = 3
+        self.hp = 3
+        self.hurt_timer = 0
+
+    def handle_input(self, inputs):
+        dx = 0
+        dy = 0
+        if inputs & INPUT_LEFT:
+            dx = -1
+            dy = 0
+        elif inputs & INPUT_RIGHT:
+            dx = 1
+            dy = 0
+        elif inputs & INPUT_UP:
+            dx = 0
+            dy = -1
+        elif inputs & INPUT_DOWN:
+            dx = 0
+            dy = 1
+        aim_dx = 0
+        aim_dy = 0
+        if inputs & INPUT_AIM_LEFT:
+            aim_dx = -1
+            aim_dy = 0
+        elif inputs & INPUT_AIM_RIGHT:
+            aim_dx = 1
+            aim_dy = 0
+        elif inputs & INPUT_AIM_UP:
+            aim_dx = 0
+            aim_dy = -1
+        elif inputs & INPUT_AIM_DOWN:
+            aim_dx = 0
+            aim_dy = 1
+        if aim_dx != 0 or aim_dy != 0:
+            self.dir_x = aim_dx
+            self.dir_y = aim_dy
+        if dx != 0 or dy != 0:
+            self.move(dx, dy)
+
+    def move(self, dx, dy):
+        new_x = self.grid_x + dx * self.speed
+        new_y = self.grid_y + dy * self.speed
+        if 0 <= new_x < self.width and 0 <= new_y < self.height and (new_x, new_y) not in self.walls:
+            self.grid_x = new_x
+            self.grid_y = new_y
+
+
+class Enemy:
+    def __init__(self, grid_x, grid_y, width=GRID_WIDTH, height=GRID_HEIGHT):
+        self.grid_x = grid_x
+        self.grid_y = grid_y
+        self.width = width
+        self.height = height
+        self.speed = 1
+        self.walls = set()
+        self.max_hp = 3
+        self.hp = 3
+        self.hurt_timer = 0
+
+    def step(self, action):
+        if action == 0:
+            dx, dy = 0, -1
+        elif action == 1:
+            dx, dy = 0, 1
+        elif action == 2:
+            dx, dy = -1, 0
+        else:
+            dx, dy = 1, 0
+        self.move(dx, dy)
+
+    def move(self, dx, dy):
+        new_x = self.grid_x + dx * self.speed
+        new_y = self.grid_y + dy * self.speed
+        if 0 <= new_x < self.width and 0 <= new_y < self.height and (new_x, new_y) not in self.walls:
+            self.grid_x = new_x
+            self.grid_y = new_y
+
+    def chase_player_action(self, player):
+        dx = 0
+        dy = 0
+        if abs(player.grid_x - self.grid_x) > abs(player.grid_y - self.grid_y):
+            if player.grid_x > self.grid_x:
+                dx = 1
+            elif player.grid_x < self.grid_x:
+                dx = -1
+        else:
+            if player.grid_y > self.grid_y:
+                dy = 1
+            elif player.grid_y < self.grid_y:
+                dy = -1
+        if dx == 0 and dy == 0:
+            return 0
+        if dx == 0 and dy == -1:
+            return 0
+        if dx == 0 and dy == 1:
+            return 1
+        if dx == -1 and dy == 0:
+            return 2
+        return 3
+
+
+class Simulation:
+    player_class = Player
+    enemy_class = Enemy
+    profiler = NULL_PROFILER
+    width = GRID_WIDTH
+    height = GRID_HEIGHT
+
+    def __init__(self, enemy_controller=None, recorder=None, width=None, height=None):
+        if width is not None:
+            self.width = width
+        if height is not None:
+            self.height = height
+        self.recorder = recorder
+        self.reset()
+        self.enemy_step_counter = 0
+        self.enemy_controller = enemy_controller
+
+    def reset(self):
+        self.walls = generate_walls(self.width, self.height)
+        self.player = self.player_class(3, self.height // 2, self.width, self.height)
+        self.enemy = self.enemy_class(self.width - 4, self.height // 2, self.width, self.height)
+        self.walls.discard((self.player.grid_x, self.player.grid_y))
+        self.walls.discard((self.enemy.grid_x, self.enemy.grid_y))
+        self.player.walls = self.walls
+        self.enemy.walls = self.walls
+        self.featurizer = get_featurizer(self.walls, self.width, self.height)
+        self.player.hp = self.player.max_hp
+        self.enemy.hp = self.enemy.max_hp
+        self.player.hurt_timer = 0
+        self.enemy.hurt_timer = 0
+        self.blocked = self.walls.dense()
+        self.entity_grid = np.full((self.width, self.height), -1, dtype=np.int32)
+        self.bullets = BulletPool()
+        self.running = True
+        self.game_over = False
+        self.win_text = ""
+        self.tick = 0
+
+    def spawn_player_bullet(self):
+        self.bullets.spawn(self.player.grid_x, self.player.grid_y, self.player.dir_x, self.player.dir_y, OWNER_PLAYER)
+
+    def update(self, inputs=0):
+        if inputs & INPUT_SHOOT:
+            self.spawn_player_bullet()
+        self.player.handle_input(inputs)
+        if self.player.hurt_timer > 0:
+            self.player.hurt_timer -= 1
+        if self.enemy.hurt_timer > 0:
+            self.enemy.hurt_timer -= 1
+        self.enemy_step_counter += 1
+        enemy_action = -1
+        if self.enemy_step_counter >= 2:
+            self.enemy_step_counter = 0
+            with self.profiler.phase("controller"):
+                if self.enemy_controller is not None:
+                    enemy_action = self.enemy_controller(self)
+                else:
+                    enemy_action = self.enemy.chase_player_action(self.player)
+            self.enemy.step(enemy_action)
+        self.bullets.update(self.width, self.height)
+        with self.profiler.phase("collisions"):
+            self.handle_collisions()
+        self.tick += 1
+        if self.recorder is not None:
+            self.recorder.record(inputs, enemy_action)
+
+    def handle_collisions(self):
+        self.entity_grid[self.enemy.grid_x, self.enemy.grid_y] = 0
+        hits = self.bullets.collide(self.blocked, self.entity_grid, OWNER_PLAYER)
+        self.entity_grid[self.enemy.grid_x, self.enemy.grid_y] = -1
+        if len(hits) and self.enemy.hurt_timer == 0:
+            self.enemy.hp -= 1
+            self.enemy.hurt_timer = 12
+            if self.enemy.hp <= 0:
+                self.game_over = True
+                self.win_text = "Player Wins"
+        if self.player.grid_x == self.enemy.grid_x and self.player.grid_y == self.enemy.grid_y:
+            if self.player.hurt_timer == 0 and not self.game_over:
+                self.player.hp -= 1
+                self.player.hurt_timer = 12
+                if self.player.hp <= 0:
+                    self.game_over = True
+                    self.win_text = "Enemy Wins"
+
+    def snapshot(self):
+        return {
+            "tick": self.tick,
+            "enemy_step_counter": self.enemy_step_counter,
+            "player": (
+                self.player.grid_x,
+                self.player.grid_y,
+                self.player.dir_x,
+                self.player.dir_y,
+                self.player.hp,
+                self.player.hurt_timer,
+            ),
+            "enemy": (self.enemy.grid_x, self.enemy.grid_y, self.enemy.hp, self.enemy.hurt_timer),
+            "game_over": self.game_over,
+            "win_text": self.win_text,
+            "bullets": self.bullets.snapshot(),
+        }
+
+    def restore(self, snapshot):
+        self.tick = snapshot["tick"]
+        self.enemy_step_counter = snapshot["enemy_step_counter"]
+        p = self.player
+        p.grid_x, p.grid_y, p.dir_x, p.dir_y, p.hp, p.hurt_timer = snapshot["player"]
+        e = self.enemy
+        e.grid_x, e.grid_y, e.hp, e.hurt_timer = snapshot["enemy"]
+        self.game_over = snapshot["game_over"]
+        self.win_text = snapshot["win_text"]
+        self.bullets.restore(snapshot["bullets"])
+
+    def run_match(self, input_policy, max_ticks=10000):
+        self.reset()
+        ticks = 0
+        while not self.game_over and ticks < max_ticks:
+            self.update(input_policy(self))
+            ticks += 1
+        return ticks
@@ -0,0 +1,160 @@
+import argparse
+import itertools
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import torch
+
+from dqn_agent import train_dqn
+
+
+DEFAULT_SPACE = {
+    "gamma": [0.95, 0.99],
+    "lr": (1e-4, 3e-3),
+    "batch_size": [32, 64, 128],
+    "epsilon_decay": [0.99, 0.995, 0.997],
+    "target_update_interval": [5, 10, 20],
+}
+
+
+def grid_configs(space):
+    names = list(space)
+    for values in itertools.product(*(space[name] for name in names)):
+        yield dict(zip(names, values))
+
+
+def random_configs(space, num_trials, seed=0):
+    rng = random.Random(seed)
+    for _ in range(num_trials):
+        config = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                config[name] = rng.uniform(*values)
+            else:
+                config[name] = rng.choice(values)
+        yield config
+
+
+class AshaScheduler:
+    def __init__(self, manager, min_episodes=100, eta=3, max_episodes=1500):
+        self.eta = eta
+        self.rungs = []
+        rung = min_episodes
+        while rung < max_episodes:
+            self.rungs.append(rung)
+            rung *= eta
+        self.scores = manager.dict({rung: [] for rung in self.rungs})
+        self.lock = manager.Lock()
+
+    def rung_for(self, previous, episode):
+        crossed = [rung for rung in self.rungs if previous < rung <= episode]
+        return crossed[-1] if crossed else None
+
+    def report(self, episode, score, previous=0):
+        rung = self.rung_for(previous, episode)
+        if rung is None:
+            return True
+        with self.lock:
+            scores = self.scores[rung] + [score]
+            self.scores[rung] = scores
+        if len(scores) < self.eta:
+            return True
+        ranked = sorted(scores, reverse=True)
+        cutoff = ranked[max(0, len(ranked) // self.eta - 1)]
+        return score >= cutoff
+
+
+def run_trial(trial_id, config, out_dir, scheduler, reports, threads):
+    torch.set_num_threads(threads)
+    model_path = os.path.join(out_dir, f"trial_{trial_id:04d}.pth")
+    last = {"episode": 0, "score": float("-inf"), "stopped": False}
+
+    def report(episode, score):
+        keep_going = scheduler.report(episode, score, last["episode"])
+        last.update(episode=episode, score=score, stopped=not keep_going)
+        reports.put({"trial": trial_id, "episode": episode, "avg_reward": score, "continue": keep_going})
+        return keep_going
+
+    train_dqn(model_path=model_path, report_callback=report, **config)
+    return {"trial": trial_id, "config": config, "model_path": model_path, **last}
+
+
+def drain(reports, results_file):
+    while True:
+        try:
+            report = reports.get_nowait()
+        except queue.Empty:
+            return
+        results_file.write(json.dumps(report) + "\n")
+        results_file.flush()
+        status = "" if report["continue"] else " (stopped)"
+        print(f"trial {report['trial']} episode {report['episode']}: avg reward {report['avg_reward']:.2f}{status}")
+
+
+def run_sweep(
+    configs,
+    out_dir="sweep",
+    episodes=1500,
+    workers=None,
+    threads_per_trial=1,
+    min_episodes=100,
+    eta=3,
+):
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_trial)
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    scheduler = AshaScheduler(manager, min_episodes=min_episodes, eta=eta, max_episodes=episodes)
+    reports = manager.Queue()
+    finished = []
+    with open(os.path.join(out_dir, "results.jsonl"), "a") as results_file:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            pending = {
+                pool.submit(run_trial, trial_id, dict(config, episodes=episodes), out_dir, scheduler, reports, threads_per_trial)
+                for trial_id, config in enumerate(configs)
+            }
+            while pending:
+                done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+                drain(reports, results_file)
+                for future in done:
+                    finished.append(future.result())
+        drain(reports, results_file)
+    manager.shutdown()
+
+    best = max(finished, key=lambda trial: (trial["episode"], trial["score"]))
+    with open(os.path.join(out_dir, "best.json"), "w") as f:
+        json.dump(best, f, indent=2)
+    print(f"best trial {best['trial']}: avg reward {best['score']:.2f}, checkpoint {best['model_path']}")
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mode", choices=["grid", "random"], default="random")
+    parser.add_argument("--trials", type=int, default=27)
+    parser.add_argument("--episodes", type=int, default=1500)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--threads-per-trial", type=int, default=1)
+    parser.add_argument("--min-episodes", type=int, default=100)
+    parser.add_argument("--eta", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default="sweep")
+    args = parser.parse_args()
+    if args.mode == "grid":
+        space = {name: values for name, values in DEFAULT_SPACE.items() if not isinstance(values, tuple)}
+        configs = list(grid_configs(space))
+    else:
+        configs = list(random_configs(DEFAULT_SPACE, args.trials, args.seed))
+    run_sweep(
+        configs,
+        out_dir=args.out_dir,
+        episodes=args.episodes,
+        workers=args.workers,
+        threads_per_trial=args.threads_per_trial,
+        min_episodes=args.min_episodes,
+        eta=args.eta,
+    )
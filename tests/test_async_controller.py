@@ -0,0 +1,25 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import torch
+
+from async_controller import AsyncEnemyController
+from dqn_agent import build_enemy_dqn
+from features import observation_dim
+from play_with_ai import make_enemy_controller
+from sim_core import Simulation
+
+
+def test_async_controller_runs_egocentric_model(tmp_path):
+    path = tmp_path / "ego.pth"
+    torch.save(build_enemy_dqn(observation_dim(3), 4).state_dict(), path)
+    controller = AsyncEnemyController(make_enemy_controller(str(path)), budget=1.0)
+    sim = Simulation(enemy_controller=controller)
+    try:
+        for _ in range(20):
+            sim.update(0)
+    finally:
+        controller.close()
+    assert controller.decisions == 10
+    assert controller.late == 0
@@ -0,0 +1,23 @@
+import numpy as np
+
+from features import EgocentricFeaturizer
+from layouts import get_layout
+
+
+def random_cells(layout, count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(size, size=count) for size in (layout.width, layout.height) * 2]
+
+
+def test_egocentric_window_matches_walls():
+    layout = get_layout(3)
+    radius = 4
+    featurizer = EgocentricFeaturizer(layout.walls, layout.width, layout.height, radius)
+    blocked = np.pad(layout.blocked, radius, constant_values=True)
+    ex, ey, px, py = random_cells(layout, 100)
+    batch = featurizer.batch(ex, ey, px, py)
+    for i in range(len(ex)):
+        state = featurizer.state(int(ex[i]), int(ey[i]), int(px[i]), int(py[i]))
+        assert np.array_equal(state, batch[i])
+        window = blocked[ex[i]:ex[i] + 2 * radius + 1, ey[i]:ey[i] + 2 * radius + 1]
+        assert np.array_equal(state[:featurizer.patch].reshape(window.shape), window)
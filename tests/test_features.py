@@ -0,0 +1,37 @@
+import numpy as np
+
+from features import get_featurizer
+from layouts import fixed_layout
+from sim_core import ACTION_DELTAS, GRID_WIDTH, GRID_HEIGHT, Simulation
+
+
+def random_cells(count, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.integers(size, size=count) for size in (GRID_WIDTH, GRID_HEIGHT) * 2]
+
+
+def reference_state(walls, ex, ey, px, py):
+    dx = px - ex
+    dy = py - ey
+    blocked = [
+        not (0 <= ex + mx < GRID_WIDTH and 0 <= ey + my < GRID_HEIGHT) or (ex + mx, ey + my) in walls
+        for mx, my in ACTION_DELTAS
+    ]
+    return np.array(
+        [dx / GRID_WIDTH, dy / GRID_HEIGHT, (abs(dx) + abs(dy)) / (GRID_WIDTH + GRID_HEIGHT)]
+        + [float(b) for b in blocked]
+        + [px / GRID_WIDTH, py / GRID_HEIGHT, ex / GRID_WIDTH, ey / GRID_HEIGHT],
+        dtype=np.float32,
+    )
+
+
+def test_featurizer_matches_reference_and_batch():
+    for walls in (fixed_layout().walls, Simulation().walls):
+        featurizer = get_featurizer(walls)
+        ex, ey, px, py = random_cells(300)
+        batch = featurizer.batch(ex, ey, px, py)
+        for i in range(len(ex)):
+            cells = int(ex[i]), int(ey[i]), int(px[i]), int(py[i])
+            state = featurizer.state(*cells)
+            assert np.array_equal(state, reference_state(walls, *cells))
+            assert np.array_equal(state, batch[i])
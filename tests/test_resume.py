@@ -0,0 +1,30 @@
+import os
+import random
+
+import numpy as np
+import pytest
+import torch
+
+from dqn_agent import train_dqn
+
+
+@pytest.mark.parametrize("prioritized", [False, True])
+def test_resume_is_bit_for_bit(tmp_path, prioritized):
+    kwargs = {"episodes": 6, "max_steps": 60, "batch_size": 16, "prioritized": prioritized}
+    torch.set_num_threads(1)
+    random.seed(1)
+    np.random.seed(1)
+    torch.manual_seed(1)
+    checkpoint_dir = str(tmp_path / "checkpoints")
+    full = train_dqn(
+        model_path=str(tmp_path / "full.pth"), checkpoint_dir=checkpoint_dir, checkpoint_interval=2, **kwargs
+    )
+    resumed = train_dqn(
+        model_path=str(tmp_path / "resumed.pth"),
+        resume=os.path.join(checkpoint_dir, "checkpoint_000004.pt"),
+        **kwargs,
+    )
+    assert full == resumed
+    a = torch.load(tmp_path / "full.pth")
+    b = torch.load(tmp_path / "resumed.pth")
+    assert all(torch.equal(a[key], b[key]) for key in a)
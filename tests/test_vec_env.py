@@ -0,0 +1,29 @@
+import random
+
+import numpy as np
+
+from rl_env import RLEnvironment, VecRLEnvironment
+
+
+def test_vec_env_matches_single_env_steps():
+    num_envs = 8
+    vec = VecRLEnvironment(num_envs, max_steps=60, rngs=[random.Random(seed) for seed in range(num_envs)])
+    rngs = [random.Random(seed) for seed in range(num_envs)]
+    envs = [RLEnvironment(max_steps=60) for _ in range(num_envs)]
+    actions_rng = random.Random(99)
+    saved = random.getstate()
+    try:
+        for _ in range(500):
+            actions = [actions_rng.randrange(4) for _ in range(num_envs)]
+            states, rewards, dones = vec.step(actions)
+            for i, env in enumerate(envs):
+                random.setstate(rngs[i].getstate())
+                state, reward, done = env.step(actions[i])
+                rngs[i].setstate(random.getstate())
+                assert np.array_equal(states[i], state)
+                assert rewards[i] == reward
+                assert dones[i] == done
+                if done:
+                    env.reset()
+    finally:
+        random.setstate(saved)
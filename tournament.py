@@ -0,0 +1,294 @@
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+
+from arena import ACTION_DX, ACTION_DY, chase_actions
+from layouts import fixed_layout, get_layout, start_cells
+from pathfinding import NO_ACTION, UNREACHABLE
+from rl_env import PLAYER_MOVES, layout_featurizer, wall_grid
+
+
+PLAYER_DX = np.array([m[0] for m in PLAYER_MOVES], dtype=np.int64)
+PLAYER_DY = np.array([m[1] for m in PLAYER_MOVES], dtype=np.int64)
+Z_95 = 1.959964
+
+
+def layout_for(layout_seed):
+    return get_layout(layout_seed) if layout_seed is not None else fixed_layout()
+
+
+@lru_cache(maxsize=None)
+def padded_blocked(layout):
+    return wall_grid(layout.walls, layout.width, layout.height)
+
+
+def move_cells(blocked, x, y, dx, dy):
+    new_x = x + dx
+    new_y = y + dy
+    free = ~blocked[new_x + 1, new_y + 1]
+    return np.where(free, new_x, x), np.where(free, new_y, y)
+
+
+def path_distances(layout, ax, ay, bx, by):
+    manhattan = np.abs(ax - bx) + np.abs(ay - by)
+    pf = layout.pathfinder
+    d = pf.dist[pf.cell(ax, ay), pf.cell(bx, by)].astype(np.int64)
+    return np.where(d == UNREACHABLE, manhattan, d)
+
+
+def load_dqn(path):
+    import torch
+
+    from dqn_agent import load_enemy_dqn
+
+    return load_enemy_dqn(path, torch.device("cpu"))
+
+
+def dqn_actions(model, layout, ex, ey, px, py):
+    import torch
+
+    from dqn_agent import model_view_radius
+
+    states = torch.from_numpy(layout_featurizer(layout, model_view_radius(model)).batch(ex, ey, px, py))
+    with torch.no_grad():
+        return model(states).argmax(1).numpy()
+
+
+def path_actions(layout, ex, ey, px, py):
+    pf = layout.pathfinder
+    hops = pf.next_hop[pf.cell(ex, ey), pf.cell(px, py)]
+    return np.where(hops == NO_ACTION, chase_actions(ex, ey, px, py), hops).astype(np.int64)
+
+
+@lru_cache(maxsize=None)
+def build_controller(spec, layout_seed=None):
+    layout = layout_for(layout_seed)
+    kind, _, path = spec.partition(":")
+    if kind == "chase":
+        return lambda ex, ey, px, py, rng: chase_actions(ex, ey, px, py)
+    if kind == "path":
+        return lambda ex, ey, px, py, rng: path_actions(layout, ex, ey, px, py)
+    if kind == "dqn":
+        model = load_dqn(path)
+        return lambda ex, ey, px, py, rng: dqn_actions(model, layout, ex, ey, px, py)
+    if kind == "hybrid":
+        model = load_dqn(path)
+
+        def hybrid(ex, ey, px, py, rng):
+            rule = rng.random(len(ex)) < 0.5
+            return np.where(rule, path_actions(layout, ex, ey, px, py), dqn_actions(model, layout, ex, ey, px, py))
+
+        return hybrid
+    if kind == "table":
+        table = np.load(path, mmap_mode="r")
+        return lambda ex, ey, px, py, rng: np.asarray(table[ex, ey, px, py], dtype=np.int64)
+    raise ValueError(f"unknown controller spec {spec!r}")
+
+
+def scripted_player(layout, ex, ey, px, py, rng):
+    diff_x = ex - px
+    diff_y = ey - py
+    horizontal = np.abs(diff_x) > np.abs(diff_y)
+    greedy_dx = np.where(horizontal, -np.sign(diff_x), 0)
+    greedy_dy = np.where(horizontal, 0, -np.sign(diff_y))
+    moves = rng.integers(len(PLAYER_MOVES), size=len(ex))
+    greedy = rng.random(len(ex)) < 0.6
+    return np.where(greedy, greedy_dx, PLAYER_DX[moves]), np.where(greedy, greedy_dy, PLAYER_DY[moves])
+
+
+def evasive_player(layout, ex, ey, px, py, rng):
+    blocked = padded_blocked(layout)
+    scores = np.empty((len(ex), len(PLAYER_MOVES)))
+    for m in range(len(PLAYER_MOVES)):
+        nx, ny = move_cells(blocked, px, py, PLAYER_DX[m], PLAYER_DY[m])
+        scores[:, m] = path_distances(layout, ex, ey, nx, ny)
+    best = np.argmax(scores + rng.random(scores.shape) * 0.5, axis=1)
+    return PLAYER_DX[best], PLAYER_DY[best]
+
+
+def random_player(layout, ex, ey, px, py, rng):
+    moves = rng.integers(len(PLAYER_MOVES), size=len(ex))
+    return PLAYER_DX[moves], PLAYER_DY[moves]
+
+
+PLAYER_POLICIES = {
+    "scripted": scripted_player,
+    "evasive": evasive_player,
+    "random": random_player,
+}
+
+
+def run_episodes(controller, player_policy, layout, episodes, max_steps, rng, random_starts=False):
+    blocked = padded_blocked(layout)
+    (px0, py0), (ex0, ey0) = start_cells(layout.width, layout.height)
+    px = np.full(episodes, px0, dtype=np.int64)
+    py = np.full(episodes, py0, dtype=np.int64)
+    ex = np.full(episodes, ex0, dtype=np.int64)
+    ey = np.full(episodes, ey0, dtype=np.int64)
+    if random_starts:
+        open_cells = np.argwhere(~layout.blocked)
+        picks = rng.integers(len(open_cells), size=(episodes, 2))
+        px, py = open_cells[picks[:, 0], 0], open_cells[picks[:, 0], 1]
+        ex, ey = open_cells[picks[:, 1], 0], open_cells[picks[:, 1], 1]
+    steps_to_capture = np.full(episodes, -1, dtype=np.int64)
+    active = np.flatnonzero((ex != px) | (ey != py))
+    steps_to_capture[(ex == px) & (ey == py)] = 0
+    ex, ey, px, py = ex[active], ey[active], px[active], py[active]
+    for step in range(1, max_steps + 1):
+        if len(active) == 0:
+            break
+        actions = controller(ex, ey, px, py, rng)
+        ex, ey = move_cells(blocked, ex, ey, ACTION_DX[actions], ACTION_DY[actions])
+        dx, dy = player_policy(layout, ex, ey, px, py, rng)
+        px, py = move_cells(blocked, px, py, dx, dy)
+        caught = (ex == px) & (ey == py)
+        steps_to_capture[active[caught]] = step
+        keep = ~caught
+        active, ex, ey, px, py = active[keep], ex[keep], ey[keep], px[keep], py[keep]
+    return steps_to_capture
+
+
+def init_worker():
+    import torch
+
+    torch.set_num_threads(1)
+
+
+def evaluate_chunk(spec, player, episodes, max_steps, seed, layout_seed=None, random_starts=False):
+    layout = layout_for(layout_seed)
+    rng = np.random.default_rng(seed)
+    steps = run_episodes(
+        build_controller(spec, layout_seed), PLAYER_POLICIES[player], layout, episodes, max_steps, rng, random_starts
+    )
+    captured = steps[steps >= 0]
+    return {
+        "controller": spec,
+        "player": player,
+        "episodes": episodes,
+        "captures": int(len(captured)),
+        "steps_sum": float(captured.sum()),
+        "steps_sq_sum": float((captured.astype(np.float64) ** 2).sum()),
+    }
+
+
+def wilson_interval(successes, n, z=Z_95):
+    if n == 0:
+        return 0.0, 0.0
+    p = successes / n
+    denom = 1 + z * z / n
+    center = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return center - half, center + half
+
+
+def two_proportion_p_value(a_successes, a_n, b_successes, b_n):
+    pooled = (a_successes + b_successes) / (a_n + b_n)
+    se = math.sqrt(pooled * (1 - pooled) * (1 / a_n + 1 / b_n))
+    if se == 0:
+        return 1.0
+    z = (a_successes / a_n - b_successes / b_n) / se
+    return math.erfc(abs(z) / math.sqrt(2))
+
+
+def summarize(chunks):
+    totals = {}
+    for chunk in chunks:
+        key = (chunk["controller"], chunk["player"])
+        total = totals.setdefault(key, {"episodes": 0, "captures": 0, "steps_sum": 0.0, "steps_sq_sum": 0.0})
+        for field in total:
+            total[field] += chunk[field]
+    results = []
+    for (spec, player), total in totals.items():
+        n = total["episodes"]
+        k = total["captures"]
+        low, high = wilson_interval(k, n)
+        result = {"controller": spec, "player": player, "episodes": n, "captures": k, "capture_rate": k / n, "capture_ci": [low, high]}
+        if k:
+            mean = total["steps_sum"] / k
+            var = max(0.0, total["steps_sq_sum"] / k - mean * mean) * k / max(1, k - 1)
+            half = Z_95 * math.sqrt(var / k)
+            result["mean_steps"] = mean
+            result["steps_ci"] = [mean - half, mean + half]
+        results.append(result)
+    return results
+
+
+def run_tournament(
+    controllers,
+    players=tuple(PLAYER_POLICIES),
+    episodes=2000,
+    max_steps=400,
+    chunk_size=250,
+    workers=None,
+    seed=0,
+    layout_seed=None,
+    random_starts=False,
+):
+    tasks = []
+    for p_index, player in enumerate(players):
+        for start in range(0, episodes, chunk_size):
+            chunk_seed = seed * 1000003 + p_index * 10007 + start
+            for spec in controllers:
+                tasks.append((spec, player, min(chunk_size, episodes - start), max_steps, chunk_seed, layout_seed, random_starts))
+    workers = workers or os.cpu_count() or 1
+    ctx = mp.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=init_worker) as pool:
+        chunks = list(pool.map(evaluate_chunk, *zip(*tasks)))
+    results = summarize(chunks)
+    by_key = {(r["controller"], r["player"]): r for r in results}
+    baseline = controllers[0]
+    for result in results:
+        base = by_key[(baseline, result["player"])]
+        if result["controller"] != baseline:
+            result["p_value_vs_" + baseline] = two_proportion_p_value(
+                result["captures"], result["episodes"], base["captures"], base["episodes"]
+            )
+    return results
+
+
+def print_results(results):
+    for r in sorted(results, key=lambda r: (r["player"], -r["capture_rate"])):
+        low, high = r["capture_ci"]
+        line = f"{r['player']:>9} {r['controller']:<32} capture {r['capture_rate']:.1%} [{low:.1%}, {high:.1%}]"
+        if "mean_steps" in r:
+            line += f", steps {r['mean_steps']:.1f} [{r['steps_ci'][0]:.1f}, {r['steps_ci'][1]:.1f}]"
+        p_values = [value for name, value in r.items() if name.startswith("p_value_vs_")]
+        if p_values:
+            line += f", p={p_values[0]:.3g}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--controllers", nargs="+", default=["hybrid:enemy_dqn.pth", "dqn:enemy_dqn.pth", "path", "chase"])
+    parser.add_argument("--players", nargs="+", choices=sorted(PLAYER_POLICIES), default=sorted(PLAYER_POLICIES))
+    parser.add_argument("--episodes", type=int, default=2000)
+    parser.add_argument("--max-steps", type=int, default=400)
+    parser.add_argument("--chunk-size", type=int, default=250)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--layout-seed", type=int, default=None)
+    parser.add_argument("--random-starts", action="store_true")
+    parser.add_argument("--out", default="tournament.json")
+    args = parser.parse_args()
+
+    results = run_tournament(
+        args.controllers,
+        args.players,
+        episodes=args.episodes,
+        max_steps=args.max_steps,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        seed=args.seed,
+        layout_seed=args.layout_seed,
+        random_starts=args.random_starts,
+    )
+    print_results(results)
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
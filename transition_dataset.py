@@ -0,0 +1,155 @@
+import glob
+import os
+import queue
+import random
+import threading
+
+import numpy as np
+
+from match_log import ReplaySimulator
+from replay_memory import REPLAY_FIELDS
+from layouts import fixed_layout
+from rl_env import chase_reward, layout_featurizer
+
+
+class TransitionWriter:
+    def __init__(self, path, shard_size=100000, state_dim=11):
+        self.path = path
+        self.shard_size = shard_size
+        self.state_dim = state_dim
+        os.makedirs(path, exist_ok=True)
+        self.shard_index = len(glob.glob(os.path.join(path, "shard_*.npz")))
+        self.reset_buffer()
+
+    def reset_buffer(self):
+        self.states = np.zeros((self.shard_size, self.state_dim), dtype=np.float32)
+        self.actions = np.zeros(self.shard_size, dtype=np.int64)
+        self.rewards = np.zeros(self.shard_size, dtype=np.float32)
+        self.next_states = np.zeros((self.shard_size, self.state_dim), dtype=np.float32)
+        self.dones = np.zeros(self.shard_size, dtype=np.bool_)
+        self.count = 0
+
+    def push(self, transition):
+        state, action, reward, next_state, done = transition
+        i = self.count
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self.count += 1
+        if self.count == self.shard_size:
+            self.flush()
+
+    def flush(self):
+        if self.count == 0:
+            return
+        n = self.count
+        shard_path = os.path.join(self.path, f"shard_{self.shard_index:05d}.npz")
+        arrays = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        np.savez_compressed(shard_path, **{name: array[:n] for name, array in zip(REPLAY_FIELDS, arrays)})
+        self.shard_index += 1
+        self.reset_buffer()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def list_shards(path):
+    return sorted(glob.glob(os.path.join(path, "shard_*.npz")))
+
+
+def load_shard(shard_path):
+    with np.load(shard_path) as data:
+        return tuple(data[name] for name in REPLAY_FIELDS)
+
+
+def shard_reader(shards, out, seed, stop):
+    rng = np.random.default_rng(seed)
+    try:
+        for shard_path in shards:
+            if stop.is_set():
+                break
+            columns = load_shard(shard_path)
+            order = rng.permutation(len(columns[0]))
+            out.put(tuple(column[order] for column in columns))
+    finally:
+        out.put(None)
+
+
+def stream_batches(path, batch_size, epochs=1, shuffle_buffer=200000, prefetch=2, seed=None):
+    rng = np.random.default_rng(seed)
+    shards = list_shards(path)
+    for _ in range(epochs):
+        order = list(shards)
+        random.Random(int(rng.integers(2**31))).shuffle(order)
+        decoded = queue.Queue(maxsize=prefetch)
+        stop = threading.Event()
+        reader = threading.Thread(target=shard_reader, args=(order, decoded, int(rng.integers(2**31)), stop), daemon=True)
+        reader.start()
+        pending = None
+        try:
+            while True:
+                columns = decoded.get()
+                if columns is not None:
+                    if pending is None:
+                        pending = columns
+                    else:
+                        pending = tuple(np.concatenate([a, b]) for a, b in zip(pending, columns))
+                    if len(pending[0]) < shuffle_buffer:
+                        continue
+                if pending is None:
+                    break
+                order = rng.permutation(len(pending[0]))
+                pending = tuple(column[order] for column in pending)
+                keep = 0 if columns is None else len(pending[0]) % batch_size
+                usable = len(pending[0]) - keep
+                for start in range(0, usable, batch_size):
+                    end = min(start + batch_size, usable)
+                    yield tuple(column[start:end] for column in pending)
+                pending = tuple(column[usable:] for column in pending) if keep else None
+                if columns is None:
+                    break
+        finally:
+            stop.set()
+            while reader.is_alive():
+                try:
+                    decoded.get_nowait()
+                except queue.Empty:
+                    reader.join(0.01)
+
+
+def sim_state(sim, featurizer):
+    return featurizer.state(sim.enemy.grid_x, sim.enemy.grid_y, sim.player.grid_x, sim.player.grid_y)
+
+
+def write_match_log(log, writer, view_radius=None):
+    replay = ReplaySimulator(log)
+    featurizer = layout_featurizer(fixed_layout(replay.sim.width, replay.sim.height), view_radius)
+    if featurizer.state_dim != writer.state_dim:
+        raise ValueError(f"writer stores {writer.state_dim}-feature states, view radius {view_radius} gives {featurizer.state_dim}")
+    previous = []
+
+    def close_transition(sim, next_state, done):
+        prev_state, prev_action, prev_dist, prev_hp = previous.pop()
+        dist = abs(sim.player.grid_x - sim.enemy.grid_x) + abs(sim.player.grid_y - sim.enemy.grid_y)
+        caught = sim.player.hp < prev_hp
+        writer.push((prev_state, prev_action, chase_reward(prev_dist, dist, caught), next_state, done))
+
+    def on_decision(sim, action):
+        state = sim_state(sim, featurizer)
+        if previous:
+            close_transition(sim, state, False)
+        dist = abs(sim.player.grid_x - sim.enemy.grid_x) + abs(sim.player.grid_y - sim.enemy.grid_y)
+        previous.append((state, action, dist, sim.player.hp))
+
+    replay.on_decision = on_decision
+    sim = replay.run()
+    if previous:
+        close_transition(sim, sim_state(sim, featurizer), sim.game_over)
@@ -0,0 +1,163 @@
+import argparse
+import time
+
+import numpy as np
+
+from layouts import fixed_layout, get_layout, start_cells
+from pathfinding import UNREACHABLE
+from rl_env import PLAYER_MOVES, chase_rewards
+from sim_core import ACTION_DELTAS
+
+
+GREEDY_PROB = 0.6
+
+
+def move_table(blocked, deltas):
+    width, height = blocked.shape
+    xs, ys = np.unravel_index(np.arange(width * height), (width, height))
+    table = np.empty((len(deltas), width * height), dtype=np.int64)
+    for i, (dx, dy) in enumerate(deltas):
+        nx = xs + dx
+        ny = ys + dy
+        inside = (nx >= 0) & (nx < width) & (ny >= 0) & (ny < height)
+        free = np.zeros_like(inside)
+        free[inside] = ~blocked[nx[inside], ny[inside]]
+        table[i] = np.where(free, nx * height + ny, xs * height + ys)
+    return table
+
+
+def occupiable_cells(blocked):
+    width, height = blocked.shape
+    occupiable = ~blocked
+    for x, y in start_cells(width, height):
+        occupiable[x, y] = True
+    return occupiable
+
+
+def greedy_moves(width, height):
+    xs, ys = np.unravel_index(np.arange(width * height), (width, height))
+    diff_x = xs[:, None] - xs[None, :]
+    diff_y = ys[:, None] - ys[None, :]
+    horizontal = np.abs(diff_x) > np.abs(diff_y)
+    dx = np.where(horizontal, -np.sign(diff_x), 0)
+    dy = np.where(horizontal, 0, -np.sign(diff_y))
+    moves = np.full(dx.shape, PLAYER_MOVES.index((0, 0)), dtype=np.int64)
+    for i, move in enumerate(PLAYER_MOVES):
+        moves[(dx == move[0]) & (dy == move[1])] = i
+    return moves
+
+
+class ChaseMDP:
+    def __init__(self, layout=None, geodesic=False):
+        if layout is None:
+            layout = fixed_layout()
+        self.layout = layout
+        self.width = layout.width
+        self.height = layout.height
+        blocked = layout.blocked
+        self.open_cells = np.flatnonzero(occupiable_cells(blocked).reshape(-1))
+        cells = len(self.open_cells)
+        self.cells = cells
+        index = np.full(self.width * self.height, -1, dtype=np.int64)
+        index[self.open_cells] = np.arange(cells)
+        xs, ys = np.unravel_index(self.open_cells, (self.width, self.height))
+        dist = np.abs(xs[:, None] - xs[None, :]) + np.abs(ys[:, None] - ys[None, :])
+        if geodesic:
+            geodesic_dist = layout.distances[np.ix_(self.open_cells, self.open_cells)]
+            dist = np.where(geodesic_dist == UNREACHABLE, dist, geodesic_dist).astype(np.int64)
+        enemy_moves = index[move_table(blocked, ACTION_DELTAS)[:, self.open_cells]]
+        player_moves = index[move_table(blocked, PLAYER_MOVES)[:, self.open_cells]]
+        greedy = greedy_moves(self.width, self.height)[np.ix_(self.open_cells, self.open_cells)]
+        uniform = (1.0 - GREEDY_PROB) / len(PLAYER_MOVES)
+        enemy = np.repeat(np.arange(cells), cells)
+        player = np.tile(np.arange(cells), cells)
+        dist_before = dist[enemy, player]
+
+        shape = (len(ACTION_DELTAS), len(PLAYER_MOVES), cells * cells)
+        self.next_state = np.empty(shape, dtype=np.int32)
+        self.probs = np.empty(shape, dtype=np.float32)
+        self.rewards = np.zeros((len(ACTION_DELTAS), cells * cells), dtype=np.float32)
+        for a in range(len(ACTION_DELTAS)):
+            next_enemy = enemy_moves[a, enemy]
+            chosen = greedy[next_enemy, player]
+            for m in range(len(PLAYER_MOVES)):
+                next_player = player_moves[m, player]
+                probs = np.where(chosen == m, GREEDY_PROB + uniform, uniform)
+                caught = next_enemy == next_player
+                rewards = chase_rewards(dist_before, dist[next_enemy, next_player], caught)
+                self.next_state[a, m] = next_enemy * cells + next_player
+                self.probs[a, m] = probs
+                self.rewards[a] += probs * rewards
+        self.terminal = enemy == player
+
+    def q_values(self, values, gamma):
+        return self.rewards + gamma * np.einsum("amn,amn->an", self.probs, values[self.next_state])
+
+    def solve(self, gamma=0.99, tol=1e-4, max_iterations=10000):
+        values = np.zeros(self.cells * self.cells, dtype=np.float32)
+        for iteration in range(1, max_iterations + 1):
+            q = self.q_values(values, gamma)
+            new_values = q.max(0)
+            new_values[self.terminal] = 0.0
+            delta = float(np.abs(new_values - values).max())
+            values = new_values
+            if delta < tol:
+                break
+        q = self.q_values(values, gamma)
+        q[:, self.terminal] = 0.0
+        full = self.width * self.height
+        q_table = np.zeros((full, full, len(ACTION_DELTAS)), dtype=np.float32)
+        q_table[np.ix_(self.open_cells, self.open_cells)] = q.T.reshape(self.cells, self.cells, len(ACTION_DELTAS))
+        return q_table.reshape(self.width, self.height, self.width, self.height, len(ACTION_DELTAS)), iteration, delta
+
+
+def policy_gap(q_table, actions, walls):
+    width, height = q_table.shape[:2]
+    blocked = np.zeros((width, height), dtype=bool)
+    for wx, wy in walls:
+        blocked[wx, wy] = True
+    open_cells = occupiable_cells(blocked)
+    mask = open_cells[:, :, None, None] & open_cells[None, None, :, :]
+    for x in range(width):
+        for y in range(height):
+            mask[x, y, x, y] = False
+    best = q_table.max(-1)[mask]
+    chosen = np.take_along_axis(q_table, actions[..., None].astype(np.int64), -1)[..., 0][mask]
+    regret = best - chosen
+    return {"optimal": float((regret <= 1e-4).mean()), "mean_regret": float(regret.mean()), "max_regret": float(regret.max())}
+
+
+def solve_and_save(table_path="optimal_actions.npy", q_path=None, gamma=0.99, tol=1e-4, layout_seed=None, geodesic=False):
+    layout = get_layout(layout_seed) if layout_seed is not None else fixed_layout()
+    start = time.perf_counter()
+    mdp = ChaseMDP(layout, geodesic=geodesic)
+    q_table, iterations, delta = mdp.solve(gamma, tol)
+    elapsed = time.perf_counter() - start
+    print(f"value iteration: {iterations} iterations, residual {delta:.2e}, {elapsed:.1f}s")
+    np.save(table_path, q_table.argmax(-1).astype(np.uint8))
+    if q_path is not None:
+        np.save(q_path, q_table)
+    return q_table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table-path", default="optimal_actions.npy")
+    parser.add_argument("--q-path", default=None)
+    parser.add_argument("--gamma", type=float, default=0.99)
+    parser.add_argument("--tol", type=float, default=1e-4)
+    parser.add_argument("--layout-seed", type=int, default=None)
+    parser.add_argument("--geodesic", action="store_true")
+    parser.add_argument("--model-path", default=None)
+    args = parser.parse_args()
+    if args.model_path is not None and args.layout_seed is not None:
+        parser.error("--model-path comparisons use the fixed layout the DQN is trained on")
+
+    q_table = solve_and_save(args.table_path, args.q_path, args.gamma, args.tol, args.layout_seed, args.geodesic)
+    if args.model_path is not None:
+        from policy_table import export_policy_table, load_policy_table
+
+        dqn_table_path = args.table_path.replace(".npy", "_dqn.npy")
+        export_policy_table(args.model_path, dqn_table_path)
+        gap = policy_gap(q_table, np.asarray(load_policy_table(dqn_table_path)), fixed_layout().walls)
+        print(f"EnemyDQN vs optimal: optimal actions {gap['optimal']:.2%}, mean regret {gap['mean_regret']:.4f}, max regret {gap['max_regret']:.4f}")
@@ -0,0 +1,104 @@
+import numpy as np
+
+
+class WallBits:
+    def __init__(self, width, height, data=None, frozen=False):
+        self.width = width
+        self.height = height
+        self.frozen = frozen
+        if frozen:
+            self.data = bytes(data)
+        else:
+            self.data = bytearray((width * height + 7) // 8) if data is None else bytearray(data)
+        self.bits = np.frombuffer(self.data, dtype=np.uint8)
+        self._hash = None
+
+    @classmethod
+    def from_dense(cls, solid):
+        width, height = solid.shape
+        return cls(width, height, np.packbits(solid, axis=None).tobytes())
+
+    @classmethod
+    def from_cells(cls, cells, width, height):
+        walls = cls(width, height)
+        for x, y in cells:
+            if 0 <= x < width and 0 <= y < height:
+                walls.add((x, y))
+        return walls
+
+    def __contains__(self, cell):
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = x * self.height + y
+            return bool(self.data[i >> 3] & (128 >> (i & 7)))
+        return False
+
+    def lookup(self, index):
+        return (self.bits[index >> 3] >> (7 - (index & 7))) & 1
+
+    def blocked_at(self, xs, ys):
+        xs = np.asarray(xs)
+        ys = np.asarray(ys)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        return ~inside | (self.lookup(np.where(inside, xs * self.height + ys, 0)) != 0)
+
+    def add(self, cell):
+        x, y = cell
+        i = x * self.height + y
+        self.data[i >> 3] |= 128 >> (i & 7)
+
+    def discard(self, cell):
+        x, y = cell
+        if 0 <= x < self.width and 0 <= y < self.height:
+            i = x * self.height + y
+            self.data[i >> 3] &= 255 ^ (128 >> (i & 7))
+
+    def dense(self):
+        return np.unpackbits(self.bits, count=self.width * self.height).reshape(self.width, self.height).astype(bool)
+
+    def padded(self):
+        grid = np.ones((self.width + 2, self.height + 2), dtype=bool)
+        grid[1:-1, 1:-1] = self.dense()
+        return grid
+
+    def copy(self):
+        return WallBits(self.width, self.height, self.data)
+
+    def freeze(self):
+        if self.frozen:
+            return self
+        return WallBits(self.width, self.height, self.data, frozen=True)
+
+    def __iter__(self):
+        for x, y in np.argwhere(self.dense()):
+            yield int(x), int(y)
+
+    def __len__(self):
+        return int(np.unpackbits(self.bits).sum())
+
+    def __hash__(self):
+        if not self.frozen:
+            return hash((self.width, self.height, bytes(self.data)))
+        if self._hash is None:
+            self._hash = hash((self.width, self.height, self.data))
+        return self._hash
+
+    def __eq__(self, other):
+        if isinstance(other, WallBits):
+            return self.width == other.width and self.height == other.height and self.data == other.data
+        if isinstance(other, (set, frozenset)):
+            return set(self) == other
+        return NotImplemented
+
+    def __getstate__(self):
+        return self.width, self.height, bytes(self.data), self.frozen
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __repr__(self):
+        return f"WallBits({self.width}x{self.height}, {len(self)} walls)"
+
+
+def wall_key(walls):
+    return walls.freeze() if isinstance(walls, WallBits) else frozenset(walls)